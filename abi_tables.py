@@ -0,0 +1,81 @@
+"""Generated by gen_abi_tables.py from its ABI definitions; do not edit."""
+
+CONTRACT_ADDRESS = '0x47129e886b44B5b8815e6471FCD7b31515d83242'
+
+WSTETH_ADDRESS = '0x13e5FB0B6534BB22cBC59Fae339dbBE0Dc906871'
+
+CONTRACT_ABI = [{'inputs': [],
+  'name': 'bondToken',
+  'outputs': [{'internalType': 'address', 'name': '', 'type': 'address'}],
+  'stateMutability': 'view',
+  'type': 'function'},
+ {'inputs': [],
+  'name': 'lToken',
+  'outputs': [{'internalType': 'address', 'name': '', 'type': 'address'}],
+  'stateMutability': 'view',
+  'type': 'function'},
+ {'inputs': [{'internalType': 'enum Pool.TokenType',
+              'name': 'tokenType',
+              'type': 'uint8'},
+             {'internalType': 'uint256',
+              'name': 'depositAmount',
+              'type': 'uint256'},
+             {'internalType': 'uint256',
+              'name': 'minAmount',
+              'type': 'uint256'}],
+  'name': 'create',
+  'outputs': [{'internalType': 'uint256', 'name': '', 'type': 'uint256'}],
+  'stateMutability': 'nonpayable',
+  'type': 'function'},
+ {'inputs': [{'internalType': 'enum Pool.TokenType',
+              'name': 'tokenType',
+              'type': 'uint8'},
+             {'internalType': 'uint256',
+              'name': 'depositAmount',
+              'type': 'uint256'},
+             {'internalType': 'uint256',
+              'name': 'minAmount',
+              'type': 'uint256'}],
+  'name': 'redeem',
+  'outputs': [{'internalType': 'uint256', 'name': '', 'type': 'uint256'}],
+  'stateMutability': 'nonpayable',
+  'type': 'function'}]
+
+ERC20_ABI = [{'constant': True,
+  'inputs': [{'name': '_owner', 'type': 'address'},
+             {'name': '_spender', 'type': 'address'}],
+  'name': 'allowance',
+  'outputs': [{'name': 'remaining', 'type': 'uint256'}],
+  'type': 'function'},
+ {'constant': False,
+  'inputs': [{'name': '_spender', 'type': 'address'},
+             {'name': '_value', 'type': 'uint256'}],
+  'name': 'approve',
+  'outputs': [{'name': 'success', 'type': 'bool'}],
+  'type': 'function'},
+ {'constant': True,
+  'inputs': [{'name': '_owner', 'type': 'address'}],
+  'name': 'balanceOf',
+  'outputs': [{'name': 'balance', 'type': 'uint256'}],
+  'type': 'function'}]
+
+TRANSFER_EVENT = {'anonymous': False,
+ 'inputs': [{'indexed': True, 'name': 'from', 'type': 'address'},
+            {'indexed': True, 'name': 'to', 'type': 'address'},
+            {'indexed': False, 'name': 'value', 'type': 'uint256'}],
+ 'name': 'Transfer',
+ 'type': 'event'}
+
+TRANSFER_TOPIC = '0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef'
+
+# 4-byte function selectors by name
+SELECTORS = {
+    'aggregate3': bytes.fromhex('82ad56cb'),  # aggregate3((address,bool,bytes)[])
+    'allowance': bytes.fromhex('dd62ed3e'),  # allowance(address,address)
+    'approve': bytes.fromhex('095ea7b3'),  # approve(address,uint256)
+    'balanceOf': bytes.fromhex('70a08231'),  # balanceOf(address)
+    'bondToken': bytes.fromhex('c28f4392'),  # bondToken()
+    'create': bytes.fromhex('6e530e97'),  # create(uint8,uint256,uint256)
+    'lToken': bytes.fromhex('010ee184'),  # lToken()
+    'redeem': bytes.fromhex('f0fae20f'),  # redeem(uint8,uint256,uint256)
+}
@@ -0,0 +1,157 @@
+"""Cold-start benchmark: import time, constructor time and time to first RPC.
+
+Starts a FakeChain, then launches fresh interpreters that import bot, build
+PlazaFinanceBot and send their first eth_blockNumber, timing each stage from
+process launch. One more run under ``-X importtime`` lists the slowest
+imports and which heavy modules were loaded before the first RPC. From the
+repository root:
+
+    python -m bench.bench_startup --runs 10 --json startup.json
+    python -m bench.bench_startup --budget 0.8   # exit 1 when over budget
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from bench.fake_chain import FakeChain
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules the bot only needs off the startup path
+HEAVY_MODULES = ("web3", "eth_account", "requests")
+
+PROBE = f"""
+import asyncio, json, sys, time
+stages = {{"started": time.time()}}
+import bot
+from plaza_bot import PlazaFinanceBot
+stages["imported"] = time.time()
+instance = PlazaFinanceBot()
+stages["constructed"] = time.time()
+
+async def first_rpc():
+    await instance.rpc.call("eth_blockNumber")
+    stages["answered"] = time.time()
+    stages["heavy"] = [name for name in {HEAVY_MODULES!r} if name in sys.modules]
+    await instance.close()
+
+asyncio.run(first_rpc())
+print(json.dumps(stages))
+"""
+
+
+async def probe(env, workdir, importtime=False):
+    """Run PROBE in a fresh interpreter; returns (stage offsets, stderr lines)"""
+    flags = ["-X", "importtime"] if importtime else []
+    launched = time.time()
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, *flags, "-c", PROBE,
+        cwd=workdir, env=env, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+    )
+    stdout, stderr = await process.communicate()
+    exited = time.time()
+    if process.returncode != 0:
+        raise RuntimeError(f"startup probe failed:\n{stderr.decode()}")
+    stages = json.loads(stdout.decode().strip().splitlines()[-1])
+    offsets = {
+        "interpreter_s": stages["started"] - launched,
+        "import_s": stages["imported"] - stages["started"],
+        "constructor_s": stages["constructed"] - stages["imported"],
+        "first_rpc_s": stages["answered"] - stages["constructed"],
+        "time_to_first_rpc_s": stages["answered"] - launched,
+        "process_s": exited - launched,
+    }
+    return offsets, stages["heavy"], stderr.decode().splitlines()
+
+
+def slowest_imports(lines, top):
+    """(module, cumulative ms, self ms) for the slowest imports in -X importtime output"""
+    imports = []
+    for line in lines:
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        imports.append((name.rstrip(), int(cumulative_us) / 1000, int(self_us) / 1000))
+    imports.sort(key=lambda item: item[1], reverse=True)
+    return imports[:top]
+
+
+async def run_benchmark(args):
+    chain = FakeChain(block_time=args.block_time, latency=args.latency)
+    url = await chain.start()
+    workdir = tempfile.mkdtemp(prefix="plaza-startup-")
+    env = {
+        **os.environ,
+        "PYTHONPATH": os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])),
+        "RPC_URL": url,
+        "RPC_URLS": url,
+        "STATE_DB": os.path.join(workdir, "state.db"),
+        "LOG_FILE": "",
+        "LOG_CONSOLE": "0",
+    }
+    for name in ("RPC_WS_URL", "RPC_RECORD", "RPC_REPLAY"):
+        env.pop(name, None)
+    try:
+        runs = [(await probe(env, workdir))[0] for _ in range(args.runs)]
+        _, heavy, lines = await probe(env, workdir, importtime=True)
+    finally:
+        await chain.stop()
+
+    return {
+        "runs": args.runs,
+        "latency_s": args.latency,
+        "median": {
+            stage: round(statistics.median(run[stage] for run in runs), 4)
+            for stage in runs[0]
+        },
+        "max_time_to_first_rpc_s": round(max(run["time_to_first_rpc_s"] for run in runs), 4),
+        "heavy_modules_loaded": heavy,
+        "slowest_imports": [
+            {"module": name.strip(), "cumulative_ms": round(cumulative, 1), "self_ms": round(own, 1)}
+            for name, cumulative, own in slowest_imports(lines, args.top)
+        ],
+    }
+
+
+def print_report(report):
+    median = report["median"]
+    print(f"Startup, median of {report['runs']} runs:")
+    print(f"  interpreter          {median['interpreter_s']:.3f}s")
+    print(f"  import bot           {median['import_s']:.3f}s")
+    print(f"  constructor          {median['constructor_s']:.3f}s")
+    print(f"  first RPC            {median['first_rpc_s']:.3f}s")
+    print(f"  time to first RPC    {median['time_to_first_rpc_s']:.3f}s "
+          f"(max {report['max_time_to_first_rpc_s']:.3f}s)")
+    print(f"Heavy modules loaded:  {', '.join(report['heavy_modules_loaded']) or 'none'}")
+    print()
+    print(f"{'import':<40}{'cumul (ms)':>12}{'self (ms)':>11}")
+    for item in report["slowest_imports"]:
+        print(f"{item['module']:<40}{item['cumulative_ms']:>12.1f}{item['self_ms']:>11.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters to time")
+    parser.add_argument("--latency", type=float, default=0.0, help="injected seconds per HTTP request")
+    parser.add_argument("--block-time", type=float, default=2.0, help="seconds between mined blocks")
+    parser.add_argument("--top", type=int, default=15, help="slowest imports to list")
+    parser.add_argument("--budget", type=float, help="fail if the median time to first RPC exceeds this")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_benchmark(args))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.budget is not None and report["median"]["time_to_first_rpc_s"] > args.budget:
+        print(f"Time to first RPC over the {args.budget:.3f}s budget", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
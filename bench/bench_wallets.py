@@ -0,0 +1,218 @@
+"""Offline benchmark of the wallet pipeline against the fake chain.
+
+Runs PlazaFinanceBot.process_wallet for N synthetic wallets against a local
+FakeChain and reports wall time, RPC calls per wallet, p50/p99 latency per
+bot operation and peak RSS. From the repository root:
+
+    python -m bench.bench_wallets --wallets 20 --latency 0.05 --json bench.json
+    python -m bench.bench_wallets --wallets 20 --concurrency 5
+
+--record captures the run's RPC traffic to a cassette; --replay serves a
+cassette instead of the fake chain's RPC, e.g. one recorded in production.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from eth_utils import keccak
+from bench.fake_chain import FakeChain
+
+TIMED_METHODS = (
+    "process_wallet",
+    "fetch_snapshot",
+    "claim_faucet",
+    "approve_token",
+    "perform_operations",
+    "build_and_sign_tx",
+    "broadcast",
+    "wait_for_transaction",
+)
+
+
+def percentile(samples, q):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def time_methods(bot, samples):
+    """Wrap the bot's coroutine methods to record exact per-call durations"""
+    for name in TIMED_METHODS:
+        method = getattr(bot, name)
+
+        async def timed(*args, _method=method, _name=name, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await _method(*args, **kwargs)
+            finally:
+                samples[_name].append(time.perf_counter() - started)
+
+        setattr(bot, name, timed)
+
+
+def synthetic_wallets(count):
+    from wallets import Wallet
+
+    return [
+        Wallet(index, "0x" + keccak(text=f"plaza-bench-{index}").hex())
+        for index in range(1, count + 1)
+    ]
+
+
+async def run_benchmark(args):
+    chain = FakeChain(
+        block_time=args.block_time,
+        latency=args.latency,
+        jitter=args.jitter,
+        rate_limit=args.rate_limit,
+        stuck_rate=args.stuck_rate,
+    )
+    url = await chain.start()
+
+    # Keep the state store and token cache out of the working tree
+    workdir = tempfile.mkdtemp(prefix="plaza-bench-")
+    os.chdir(workdir)
+    os.environ["RPC_URL"] = url
+    # Unreachable endpoints ahead of the real one exercise pool failover
+    dead = [f"http://127.0.0.1:{port}" for port in range(9, 9 + args.dead_endpoints)]
+    os.environ["RPC_URLS"] = ",".join(dead + [url])
+    os.environ["STATE_DB"] = os.path.join(workdir, "state.db")
+    os.environ.pop("RPC_WS_URL", None)
+    for name, path in (("RPC_RECORD", args.record), ("RPC_REPLAY", args.replay)):
+        if path:
+            os.environ[name] = path
+    os.environ["RPC_REPLAY_SPEED"] = str(args.replay_speed)
+
+    from plaza_bot import PlazaFinanceBot
+    from executor import WalletExecutor
+    from logs import setup_logging
+
+    listener = setup_logging(path=os.getenv("LOG_FILE", ""), console=not args.quiet)
+    output = io.StringIO() if args.quiet else sys.stdout
+    with contextlib.redirect_stdout(output):
+        bot = PlazaFinanceBot()
+
+        async def claim_faucet(address):
+            # The real claim adds fixed browser-like pauses; hit the stand-in directly
+            session = await bot.rpc.session()
+            async with session.post(f"{url}/faucet/queue", json={"address": address}) as response:
+                response.raise_for_status()
+            return await bot.verify_faucet_claim(address)
+
+        bot.claim_faucet = claim_faucet
+        samples = defaultdict(list)
+        time_methods(bot, samples)
+        wallets = synthetic_wallets(args.wallets)
+        bot.signer.register(wallets)
+
+        summary = await WalletExecutor(bot, args.concurrency).run(wallets)
+        wall_time = summary.wall_time
+
+        await bot.close()
+    listener.stop()
+    await chain.stop()
+
+    http_requests = chain.counts.pop("http_requests", 0)
+    chain.counts.pop("faucet", None)
+    rate_limited = chain.counts.pop("rate_limited", 0)
+    if args.replay:
+        # The chain only saw faucet posts; count what the cassette served
+        from metrics import METRICS
+
+        chain.counts = {
+            dict(labels)["method"]: count
+            for (name, labels), count in METRICS.counters.items()
+            if name == "plaza_rpc_requests_total"
+        }
+        http_requests = sum(
+            histogram.count
+            for (name, _), histogram in METRICS.histograms.items()
+            if name == "plaza_rpc_request_seconds"
+        )
+    rpc_calls = sum(chain.counts.values())
+    return {
+        "wallets": args.wallets,
+        "succeeded": summary.count("ok"),
+        "concurrency": args.concurrency,
+        "latency_s": args.latency,
+        "block_time_s": args.block_time,
+        "wall_time_s": round(wall_time, 3),
+        "http_requests_per_wallet": round(http_requests / args.wallets, 2),
+        "rate_limited": rate_limited,
+        "rpc_calls_per_wallet": round(rpc_calls / args.wallets, 2),
+        "rpc_calls_by_method": dict(sorted(chain.counts.items())),
+        "operations": {
+            name: {
+                "count": len(values),
+                "p50_s": round(percentile(values, 0.50), 4),
+                "p99_s": round(percentile(values, 0.99), 4),
+            }
+            for name, values in samples.items()
+        },
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def print_report(report):
+    print(
+        f"Wallets:             {report['succeeded']}/{report['wallets']} succeeded, "
+        f"{report['concurrency']} at a time"
+    )
+    print(f"Wall time:           {report['wall_time_s']:.2f}s")
+    print(f"HTTP requests/wallet {report['http_requests_per_wallet']}")
+    print(f"RPC calls/wallet:    {report['rpc_calls_per_wallet']}")
+    if report["rate_limited"]:
+        print(f"HTTP 429s:           {report['rate_limited']}")
+    print(f"Peak RSS:            {report['peak_rss_mb']} MB")
+    print()
+    print(f"{'operation':<22}{'count':>7}{'p50 (s)':>10}{'p99 (s)':>10}")
+    for name, stats in report["operations"].items():
+        print(f"{name:<22}{stats['count']:>7}{stats['p50_s']:>10.4f}{stats['p99_s']:>10.4f}")
+    print()
+    for method, count in report["rpc_calls_by_method"].items():
+        print(f"  {method:<28}{count:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--wallets", type=int, default=10, help="synthetic wallets to process")
+    parser.add_argument("--concurrency", type=int, default=1, help="wallets processed at a time")
+    parser.add_argument("--latency", type=float, default=0.05, help="injected seconds per HTTP request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random latency, seconds")
+    parser.add_argument("--block-time", type=float, default=2.0, help="seconds between mined blocks")
+    parser.add_argument("--json", help="also write the report to this file")
+    parser.add_argument("--verbose", dest="quiet", action="store_false", help="show bot output")
+    parser.add_argument("--rate-limit", type=int, help="requests/s the chain accepts before HTTP 429")
+    parser.add_argument("--stuck-rate", type=float, default=0.0, help="share of transactions left unmined")
+    parser.add_argument("--dead-endpoints", type=int, default=0, help="unreachable RPC endpoints in the pool")
+    parser.add_argument("--record", help="record RPC traffic to this cassette")
+    parser.add_argument("--replay", help="serve RPC from this cassette")
+    parser.add_argument("--replay-speed", type=float, default=0, help="replay latency divisor, 0 = instant")
+    args = parser.parse_args()
+
+    json_path = os.path.abspath(args.json) if args.json else None
+    args.record = os.path.abspath(args.record) if args.record else None
+    args.replay = os.path.abspath(args.replay) if args.replay else None
+    report = asyncio.run(run_benchmark(args))
+    print_report(report)
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,459 @@
+"""Scripted JSON-RPC stand-in for Base Sepolia, used by the offline benchmarks.
+
+Serves the Plaza pool, wstETH, bond/leverage ERC20s and Multicall3 at the
+addresses PlazaFinanceBot is configured with, mines pending transactions
+every ``block_time`` seconds, and can inject per-request latency, answer
+HTTP 429 above a request rate and leave a share of transactions stuck until
+they are replaced.
+"""
+import asyncio
+import random
+import time
+from collections import Counter, defaultdict, deque
+from aiohttp import web
+from eth_abi import decode, encode
+from eth_account import Account
+from eth_account._utils.legacy_transactions import Transaction
+from eth_account._utils.typed_transactions import TypedTransaction
+from eth_utils import keccak, to_checksum_address
+from hexbytes import HexBytes
+
+CHAIN_ID = 84532
+WSTETH = to_checksum_address("0x13e5fb0b6534bb22cbc59fae339dbbe0dc906871")
+POOL = to_checksum_address("0x47129e886b44B5b8815e6471FCD7b31515d83242")
+BOND = to_checksum_address("0x" + "b0" * 20)
+LEVERAGE = to_checksum_address("0x" + "1e" * 20)
+MULTICALL3 = to_checksum_address("0xcA11bde05977b3631167028862bE2a173976CA11")
+ZERO = "0x" + "00" * 20
+TRANSFER_TOPIC = "0x" + keccak(text="Transfer(address,address,uint256)").hex()
+BASE_FEE = 10_000_000  # 0.01 gwei
+BOND_RATE = 30
+LEVERAGE_RATE = 2
+
+
+def selector(signature):
+    return keccak(text=signature)[:4]
+
+
+SEL = {
+    name: selector(sig)
+    for name, sig in {
+        "balanceOf": "balanceOf(address)",
+        "allowance": "allowance(address,address)",
+        "approve": "approve(address,uint256)",
+        "bondToken": "bondToken()",
+        "lToken": "lToken()",
+        "create": "create(uint8,uint256,uint256)",
+        "redeem": "redeem(uint8,uint256,uint256)",
+        "aggregate3": "aggregate3((address,bool,bytes)[])",
+    }.items()
+}
+
+
+class Revert(Exception):
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.data = "0x08c379a0" + encode(["string"], [reason]).hex()
+
+
+def hexint(value):
+    return hex(value)
+
+
+def decode_raw_tx(raw):
+    if raw[0] <= 0x7F:
+        tx = TypedTransaction.from_bytes(HexBytes(raw)).as_dict()
+        fee = tx["maxFeePerGas"]
+    else:
+        tx = Transaction.from_bytes(raw).as_dict()
+        fee = tx["gasPrice"]
+    sender = Account.recover_transaction(raw)
+    to = tx.get("to")
+    return {
+        "from": sender,
+        "to": to_checksum_address(to) if to else None,
+        "nonce": tx["nonce"],
+        "gas": tx["gas"],
+        "fee": fee,
+        "data": bytes(tx.get("data", b"")),
+        "hash": "0x" + keccak(raw).hex(),
+    }
+
+
+class FakeChain:
+    """In-memory stand-in for the Plaza pool, its ERC20 tokens and Multicall3"""
+
+    def __init__(self, block_time=2.0, latency=0.0, jitter=0.0, eth_balance=10**18, faucet_amount=5 * 10**16,
+                 rate_limit=None, stuck_rate=0.0):
+        self.block_time = block_time
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.stuck_rate = stuck_rate
+        self._recent = deque()
+        self.eth_balance = eth_balance
+        self.faucet_amount = faucet_amount
+        self.block_number = 1_000_000
+        self.block_hashes = {self.block_number: self._block_hash(self.block_number)}
+        self.balances = defaultdict(lambda: defaultdict(int))  # token -> owner -> amount
+        self.allowances = defaultdict(int)  # (token, owner, spender) -> amount
+        self.nonces = defaultdict(int)
+        self.mempool = {}  # (sender, nonce) -> tx
+        self.receipts = {}
+        self.mined_nonces = {}  # tx hash -> nonce
+        self.logs = []
+        self.counts = Counter()
+        self._miner = None
+        self._subscribers = set()
+
+    # ------------------------------------------------------------------ state
+    @staticmethod
+    def _block_hash(number):
+        return "0x" + keccak(number.to_bytes(32, "big")).hex()
+
+    def eth_of(self, owner):
+        return self.balances["ETH"].setdefault(owner, self.eth_balance)
+
+    def _transfer(self, token, sender, recipient, amount, logs):
+        if self.balances[token][sender] < amount and sender != ZERO:
+            raise Revert("ERC20: transfer amount exceeds balance")
+        if sender != ZERO:
+            self.balances[token][sender] -= amount
+        if recipient != ZERO:
+            self.balances[token][recipient] += amount
+        logs.append(
+            {
+                "address": token,
+                "topics": [
+                    TRANSFER_TOPIC,
+                    "0x" + "00" * 12 + sender[2:].lower(),
+                    "0x" + "00" * 12 + recipient[2:].lower(),
+                ],
+                "data": "0x" + amount.to_bytes(32, "big").hex(),
+            }
+        )
+
+    def execute(self, sender, to, data, logs=None):
+        """Run a call against current state; mutates state only when logs is a list"""
+        mutate = logs is not None
+        logs = logs if mutate else []
+        sel, args = bytes(data[:4]), bytes(data[4:])
+        if to == MULTICALL3 and sel == SEL["aggregate3"]:
+            (calls,) = decode(["(address,bool,bytes)[]"], args)
+            results = []
+            for target, allow_failure, calldata in calls:
+                try:
+                    results.append((True, self.execute(sender, to_checksum_address(target), calldata)))
+                except Revert as error:
+                    if not allow_failure:
+                        raise
+                    results.append((False, bytes.fromhex(error.data[2:])))
+            return encode(["(bool,bytes)[]"], [results])
+        if to in (WSTETH, BOND, LEVERAGE):
+            if sel == SEL["balanceOf"]:
+                (owner,) = decode(["address"], args)
+                return encode(["uint256"], [self.balances[to][to_checksum_address(owner)]])
+            if sel == SEL["allowance"]:
+                owner, spender = decode(["address", "address"], args)
+                key = (to, to_checksum_address(owner), to_checksum_address(spender))
+                return encode(["uint256"], [self.allowances[key]])
+            if sel == SEL["approve"]:
+                spender, amount = decode(["address", "uint256"], args)
+                if mutate:
+                    self.allowances[(to, sender, to_checksum_address(spender))] = amount
+                return encode(["bool"], [True])
+        if to == POOL:
+            if sel == SEL["bondToken"]:
+                return encode(["address"], [BOND])
+            if sel == SEL["lToken"]:
+                return encode(["address"], [LEVERAGE])
+            if sel in (SEL["create"], SEL["redeem"]):
+                token_type, amount, _min_amount = decode(["uint8", "uint256", "uint256"], args)
+                if token_type not in (0, 1):
+                    raise Revert("Pool: invalid token type")
+                if amount == 0:
+                    raise Revert("Pool: zero amount")
+                token, rate = (BOND, BOND_RATE) if token_type == 0 else (LEVERAGE, LEVERAGE_RATE)
+                state = self if mutate else self._shadow()
+                if sel == SEL["create"]:
+                    if self.allowances[(WSTETH, sender, POOL)] < amount:
+                        raise Revert("ERC20: insufficient allowance")
+                    state._transfer(WSTETH, sender, POOL, amount, logs)
+                    state._transfer(token, ZERO, sender, amount * rate, logs)
+                    return encode(["uint256"], [amount * rate])
+                state._transfer(token, sender, ZERO, amount, logs)
+                state._transfer(WSTETH, POOL, sender, amount // rate, logs)
+                return encode(["uint256"], [amount // rate])
+        raise Revert("function selector was not recognized")
+
+    def _shadow(self):
+        shadow = FakeChain.__new__(FakeChain)
+        shadow.balances = defaultdict(lambda: defaultdict(int))
+        for token, owners in self.balances.items():
+            shadow.balances[token] = defaultdict(int, owners)
+        return shadow
+
+    def gas_for(self, to, data):
+        sel = bytes(data[:4])
+        if sel == SEL["approve"]:
+            return 46_000
+        if sel == SEL["create"]:
+            return 180_000 + random.randint(0, 4_000)
+        if sel == SEL["redeem"]:
+            return 140_000 + random.randint(0, 4_000)
+        return 21_000
+
+    def mine(self):
+        self.block_number += 1
+        block_hash = self._block_hash(self.block_number)
+        self.block_hashes[self.block_number] = block_hash
+        ready = sorted(self.mempool.values(), key=lambda tx: (tx["from"], tx["nonce"]))
+        for tx in ready:
+            if tx["nonce"] != self.nonces[tx["from"]] or tx["stuck"]:
+                continue
+            del self.mempool[(tx["from"], tx["nonce"])]
+            self.nonces[tx["from"]] += 1
+            logs, status = [], 1
+            gas_used = min(self.gas_for(tx["to"], tx["data"]), tx["gas"])
+            try:
+                if gas_used >= tx["gas"]:
+                    raise Revert("out of gas")
+                self.execute(tx["from"], tx["to"], tx["data"], logs)
+            except Revert:
+                logs, status = [], 0
+            self.balances["ETH"][tx["from"]] = self.eth_of(tx["from"]) - gas_used * BASE_FEE
+            for index, log in enumerate(logs):
+                log.update(
+                    blockNumber=hexint(self.block_number),
+                    blockHash=block_hash,
+                    transactionHash=tx["hash"],
+                    transactionIndex="0x0",
+                    logIndex=hexint(index),
+                    removed=False,
+                )
+            self.logs.extend(logs)
+            self.mined_nonces[tx["hash"]] = tx["nonce"]
+            self.receipts[tx["hash"]] = {
+                "transactionHash": tx["hash"],
+                "blockNumber": hexint(self.block_number),
+                "blockHash": block_hash,
+                "transactionIndex": "0x0",
+                "from": tx["from"],
+                "to": tx["to"],
+                "status": hexint(status),
+                "gasUsed": hexint(gas_used),
+                "cumulativeGasUsed": hexint(gas_used),
+                "effectiveGasPrice": hexint(BASE_FEE),
+                "contractAddress": None,
+                "logs": logs,
+                "logsBloom": "0x" + "00" * 256,
+                "type": "0x2",
+            }
+
+    async def _mine_forever(self):
+        while True:
+            await asyncio.sleep(self.block_time)
+            self.mine()
+            head = {"number": hexint(self.block_number), "hash": self.block_hashes[self.block_number]}
+            for ws in list(self._subscribers):
+                try:
+                    await ws.send_json(
+                        {"jsonrpc": "2.0", "method": "eth_subscription", "params": {"subscription": "0x1", "result": head}}
+                    )
+                except Exception:
+                    self._subscribers.discard(ws)
+
+    async def handle_ws(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        async for message in ws:
+            body = message.json()
+            if body.get("method") == "eth_subscribe":
+                self.counts["eth_subscribe"] += 1
+                self._subscribers.add(ws)
+                await ws.send_json({"jsonrpc": "2.0", "id": body.get("id"), "result": "0x1"})
+            else:
+                await ws.send_json(self._answer(body))
+        self._subscribers.discard(ws)
+        return ws
+
+    # -------------------------------------------------------------------- rpc
+    def dispatch(self, method, params):
+        self.counts[method] += 1
+        if method == "eth_chainId":
+            return hexint(CHAIN_ID)
+        if method == "net_version":
+            return str(CHAIN_ID)
+        if method == "web3_clientVersion":
+            return "FakeChain/1.0"
+        if method == "eth_blockNumber":
+            return hexint(self.block_number)
+        if method == "eth_gasPrice":
+            return hexint(BASE_FEE)
+        if method == "eth_maxPriorityFeePerGas":
+            return hexint(BASE_FEE // 10)
+        if method == "eth_feeHistory":
+            count = int(params[0], 16) if isinstance(params[0], str) else params[0]
+            percentiles = params[2] if len(params) > 2 else []
+            return {
+                "oldestBlock": hexint(self.block_number - count + 1),
+                "baseFeePerGas": [hexint(BASE_FEE)] * (count + 1),
+                "gasUsedRatio": [0.5] * count,
+                "reward": [[hexint(BASE_FEE // 10)] * len(percentiles)] * count,
+            }
+        if method == "eth_getBlockByNumber":
+            number = self.block_number if params[0] in ("latest", "pending") else int(params[0], 16)
+            return {
+                "number": hexint(number),
+                "hash": self.block_hashes.get(number, self._block_hash(number)),
+                "parentHash": self.block_hashes.get(number - 1, self._block_hash(number - 1)),
+                "baseFeePerGas": hexint(BASE_FEE),
+                "timestamp": hexint(int(time.time())),
+                "gasLimit": hexint(30_000_000),
+                "gasUsed": hexint(15_000_000),
+                "transactions": [],
+            }
+        if method == "eth_getBalance":
+            return hexint(self.eth_of(to_checksum_address(params[0])))
+        if method == "eth_getTransactionCount":
+            sender = to_checksum_address(params[0])
+            nonce = self.nonces[sender]
+            if len(params) > 1 and params[1] == "pending":
+                while (sender, nonce) in self.mempool:
+                    nonce += 1
+            return hexint(nonce)
+        if method in ("eth_call", "eth_estimateGas"):
+            tx = params[0]
+            sender = to_checksum_address(tx.get("from", ZERO))
+            data = bytes.fromhex(tx.get("data", tx.get("input", "0x"))[2:])
+            result = self.execute(sender, to_checksum_address(tx["to"]), data)
+            if method == "eth_estimateGas":
+                return hexint(self.gas_for(tx["to"], data) + 5_000)
+            return "0x" + result.hex()
+        if method == "eth_sendRawTransaction":
+            tx = decode_raw_tx(bytes.fromhex(params[0][2:]))
+            if tx["nonce"] < self.nonces[tx["from"]]:
+                raise ValueError("nonce too low")
+            current = self.mempool.get((tx["from"], tx["nonce"]))
+            if current is not None and current["hash"] != tx["hash"]:
+                if tx["fee"] * 10 < current["fee"] * 11:
+                    raise ValueError("replacement transaction underpriced")
+            # A stuck tx is never mined; only a replacement at the same nonce moves on
+            tx["stuck"] = random.random() < self.stuck_rate
+            self.mempool[(tx["from"], tx["nonce"])] = tx
+            return tx["hash"]
+        if method == "eth_getTransactionReceipt":
+            return self.receipts.get(params[0])
+        if method == "eth_getTransactionByHash":
+            if params[0] in self.receipts:
+                receipt = self.receipts[params[0]]
+                return {
+                    "hash": params[0],
+                    "blockNumber": receipt["blockNumber"],
+                    "from": receipt["from"],
+                    "nonce": hexint(self.mined_nonces[params[0]]),
+                }
+            for tx in self.mempool.values():
+                if tx["hash"] == params[0]:
+                    return {"hash": tx["hash"], "blockNumber": None, "from": tx["from"], "nonce": hexint(tx["nonce"])}
+            return None
+        if method == "eth_getLogs":
+            query = params[0]
+            start = int(query.get("fromBlock", "0x0"), 16)
+            end = int(query.get("toBlock", hexint(self.block_number)), 16)
+            if end - start > 2000:
+                raise ValueError("query exceeds max block range 2000")
+            addresses = query.get("address") or []
+            if isinstance(addresses, str):
+                addresses = [addresses]
+            addresses = {to_checksum_address(a) for a in addresses}
+            # Positional topic filters; None matches anything, a list is OR
+            topic_filters = [
+                None if wanted is None else {t.lower() for t in ([wanted] if isinstance(wanted, str) else wanted)}
+                for wanted in query.get("topics") or []
+            ]
+            return [
+                log
+                for log in self.logs
+                if start <= int(log["blockNumber"], 16) <= end
+                and (not addresses or log["address"] in addresses)
+                and len(log["topics"]) >= len(topic_filters)
+                and all(
+                    wanted is None or topic.lower() in wanted
+                    for wanted, topic in zip(topic_filters, log["topics"])
+                )
+            ]
+        raise ValueError(f"method {method} not supported")
+
+    def _answer(self, item):
+        try:
+            return {"jsonrpc": "2.0", "id": item.get("id"), "result": self.dispatch(item["method"], item.get("params", []))}
+        except Revert as error:
+            return {
+                "jsonrpc": "2.0",
+                "id": item.get("id"),
+                "error": {"code": 3, "message": f"execution reverted: {error}", "data": error.data},
+            }
+        except Exception as error:
+            return {"jsonrpc": "2.0", "id": item.get("id"), "error": {"code": -32000, "message": str(error)}}
+
+    def _over_rate_limit(self):
+        now = time.monotonic()
+        while self._recent and now - self._recent[0] > 1.0:
+            self._recent.popleft()
+        if len(self._recent) >= self.rate_limit:
+            return True
+        self._recent.append(now)
+        return False
+
+    async def handle_rpc(self, request):
+        if self.rate_limit and self._over_rate_limit():
+            self.counts["rate_limited"] += 1
+            return web.json_response({"message": "Too Many Requests"}, status=429)
+        if self.latency or self.jitter:
+            await asyncio.sleep(self.latency + random.uniform(0, self.jitter))
+        body = await request.json()
+        self.counts["http_requests"] += 1
+        if isinstance(body, list):
+            return web.json_response([self._answer(item) for item in body])
+        return web.json_response(self._answer(body))
+
+    async def handle_faucet(self, request):
+        body = await request.json()
+        address = to_checksum_address(body["address"])
+        self.counts["faucet"] += 1
+        # A real drip is a token transfer from the faucet wallet, so it logs one
+        logs = []
+        self._transfer(WSTETH, ZERO, address, self.faucet_amount, logs)
+        logs[0].update(
+            blockNumber=hexint(self.block_number),
+            blockHash=self.block_hashes[self.block_number],
+            transactionHash="0x" + keccak(text=f"faucet-{address}-{self.counts['faucet']}").hex(),
+            transactionIndex="0x0",
+            logIndex="0x0",
+            removed=False,
+        )
+        self.logs.extend(logs)
+        return web.json_response({"queued": True})
+
+    def app(self):
+        app = web.Application()
+        app.router.add_post("/", self.handle_rpc)
+        app.router.add_post("/faucet/queue", self.handle_faucet)
+        app.router.add_get("/ws", self.handle_ws)
+        return app
+
+    async def start(self, host="127.0.0.1", port=0):
+        runner = web.AppRunner(self.app())
+        await runner.setup()
+        site = web.TCPSite(runner, host, port)
+        await site.start()
+        self._runner = runner
+        self._miner = asyncio.create_task(self._mine_forever())
+        sockets = site._server.sockets
+        return f"http://{host}:{sockets[0].getsockname()[1]}"
+
+    async def stop(self):
+        if self._miner is not None:
+            self._miner.cancel()
+        await self._runner.cleanup()
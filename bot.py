@@ -1,116 +1,130 @@
 import asyncio
-import random
-import logging
+import os
 from datetime import datetime, timedelta
-from colorama import Fore
 from plaza_bot import PlazaFinanceBot  # Import from plaza_bot.py
+from wallets import WalletRegistry
+from metrics import MetricsExporter
+from executor import WalletExecutor
+from logs import LOG_FILE, get_logger, setup_logging
 
 # Current info
 CURRENT_USER = "Madleyym"
 CURRENT_VERSION = "2025-02-14"
 
+log = get_logger(__name__)
+
 
 async def main():
+    bot = None
+    exporter = MetricsExporter.from_env()
     try:
+        await exporter.start()
+
         # Initialize bot
         bot = PlazaFinanceBot()
+        wallet_registry = WalletRegistry("private_keys.txt")
+        executor = WalletExecutor.from_env(bot)
 
         while True:
             try:
-                # Read private keys from file
-                with open("private_keys.txt", "r") as f:
-                    private_keys = [
-                        line.strip()
-                        for line in f
-                        if line.strip() and not line.startswith("#")
-                    ]
-
-                if not private_keys:
-                    print(f"{Fore.RED}No private keys found in private_keys.txt")
+                # Load wallets (re-read only when private_keys.txt changes)
+                wallets = wallet_registry.load()
+
+                if not wallets:
+                    log.error(f"No private keys found in private_keys.txt")
                     return
 
-                print(f"{Fore.GREEN}Starting processing {len(private_keys)} wallets")
-                print(f"{Fore.YELLOW}Current user: {CURRENT_USER}")
-                print(f"{Fore.YELLOW}Bot version: {CURRENT_VERSION}")
+                # Signing workers hold the keys from their start; new keys restart them
+                bot.signer.register(wallets)
 
-                # Process each wallet
-                for idx, private_key in enumerate(private_keys, 1):
+                log.success(
+                    f"Starting processing {len(wallets)} wallets, "
+                    f"{executor.concurrency} at a time"
+                )
+                log.info(f"Current user: {CURRENT_USER}")
+                log.info(f"Bot version: {CURRENT_VERSION}")
+
+                # Resume the unfinished cycle, if the bot stopped mid-way
+                cycle_id = bot.begin_cycle()
+                log.info(f"Cycle: {cycle_id}")
+
+                # Positions come from the local event index; only new blocks
+                # are scanned. Fall back to a live multicall survey.
+                addresses = [wallet.address for wallet in wallets]
+                try:
+                    head, positions = await bot.index_positions(addresses)
+                    token_addresses = await bot.contracts.token_addresses()
+                    funded = sum(1 for p in positions.values() if p[bot.WSTETH_ADDRESS] > 0)
+                    bond_total = sum(p[token_addresses[0]] for p in positions.values())
+                    leverage_total = sum(p[token_addresses[1]] for p in positions.values())
+                    log.info(
+                        f"Index at block {head}: {funded}/{len(addresses)} wallets hold wstETH, "
+                        f"bond total {bond_total / 10**18:.4f}, "
+                        f"leverage total {leverage_total / 10**18:.4f}"
+                    )
+                except Exception as index_error:
+                    log.info(f"Event index unavailable ({str(index_error)}), surveying live")
                     try:
-                        success = await bot.process_wallet(
-                            private_key, idx, len(private_keys)
+                        survey = await bot.survey_wallets(addresses)
+                        funded = sum(1 for value in survey.column("wsteth") if value)
+                        approved = sum(1 for value in survey.column("allowance") if value)
+                        log.info(
+                            f"Survey: {funded}/{len(addresses)} wallets hold wstETH, "
+                            f"{approved} approved, "
+                            f"bond total {survey.total('bond') / 10**18:.4f}, "
+                            f"leverage total {survey.total('leverage') / 10**18:.4f}"
                         )
+                    except Exception as survey_error:
+                        log.info(f"Wallet survey skipped: {str(survey_error)}")
 
-                        # Handle delays between wallets
-                        if idx < len(private_keys):
-                            if not success:
-                                # Longer delay after failure
-                                delay = random.randint(180, 300)  # 3-5 minutes
-                                print(
-                                    f"{Fore.YELLOW}Failed attempt, waiting {delay}s before next wallet..."
-                                )
-                                await asyncio.sleep(delay)
-                            else:
-                                # Normal delay between wallets
-                                delay = random.randint(60, 120)  # 1-2 minutes
-                                print(
-                                    f"{Fore.YELLOW}Waiting {delay}s before next wallet..."
-                                )
-                                await asyncio.sleep(delay)
-
-                    except Exception as wallet_error:
-                        print(
-                            f"{Fore.RED}Error processing wallet {idx}: {str(wallet_error)}"
-                        )
-                        logging.error(
-                            f"Wallet {idx} error: {wallet_error}", exc_info=True
-                        )
-                        continue
+                # Process up to WALLET_CONCURRENCY wallets at a time
+                summary = await executor.run(wallets)
+                summary.log()
 
                 # Cycle complete, schedule next run
-                print(f"{Fore.GREEN}Cycle complete for all wallets")
+                bot.finish_cycle()
+                log.success(f"Cycle complete for all wallets")
                 next_run = datetime.now() + timedelta(hours=6)
-                print(
-                    f"{Fore.GREEN}Next run scheduled at: {next_run.strftime('%Y-%m-%d %H:%M:%S')}"
+                log.success(
+                    f"Next run scheduled at: {next_run.strftime('%Y-%m-%d %H:%M:%S')}"
                 )
 
                 # Wait 6 hours before next cycle
                 await asyncio.sleep(6 * 60 * 60)
 
             except Exception as cycle_error:
-                print(f"{Fore.RED}Cycle error: {str(cycle_error)}")
-                logging.error(f"Cycle error: {cycle_error}", exc_info=True)
+                log.error(f"Cycle error: {str(cycle_error)}", exc_info=True)
                 # Wait 5 minutes before retrying
                 await asyncio.sleep(300)
 
     except KeyboardInterrupt:
-        print(f"\n{Fore.YELLOW}Bot stopped by user (Ctrl+C)")
+        log.info(f"Bot stopped by user (Ctrl+C)")
     except Exception as fatal_error:
-        print(f"{Fore.RED}Fatal error: {str(fatal_error)}")
-        logging.error(f"Fatal error: {fatal_error}", exc_info=True)
+        log.error(f"Fatal error: {str(fatal_error)}", exc_info=True)
+    finally:
+        await exporter.stop()
+        if bot is not None:
+            await bot.close()
 
 
 if __name__ == "__main__":
+    # Records are queued and written by a background thread
+    listener = setup_logging()
     try:
-        # Configure logging
-        logging.basicConfig(
-            level=logging.INFO,
-            format="%(asctime)s - %(levelname)s: %(message)s",
-            datefmt="%Y-%m-%d %H:%M:%S",
-            handlers=[logging.FileHandler("plaza_bot.log"), logging.StreamHandler()],
-        )
-
         # Print startup message
-        print(f"\n{Fore.GREEN}=== Plaza Finance Auto Bot ===")
-        print(f"{Fore.GREEN}Version: {CURRENT_VERSION}")
-        print(f"{Fore.GREEN}User: {CURRENT_USER}")
-        print(f"{Fore.YELLOW}Press Ctrl+C to stop the bot")
-        print(f"{Fore.YELLOW}Logging to plaza_bot.log\n")
+        log.success(f"=== Plaza Finance Auto Bot ===")
+        log.success(f"Version: {CURRENT_VERSION}")
+        log.success(f"User: {CURRENT_USER}")
+        log.info(f"Press Ctrl+C to stop the bot")
+        log.info(f"Logging to {os.getenv('LOG_FILE', LOG_FILE)}")
 
         # Run the bot
         asyncio.run(main())
 
+    except KeyboardInterrupt:
+        log.info(f"Bot stopped by user (Ctrl+C)")
     except Exception as e:
-        print(f"{Fore.RED}Startup error: {str(e)}")
-        logging.error(f"Startup error: {e}", exc_info=True)
+        log.error(f"Startup error: {str(e)}", exc_info=True)
     finally:
-        print(f"\n{Fore.YELLOW}Bot shutdown complete")
+        log.info(f"Bot shutdown complete")
+        listener.stop()
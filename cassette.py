@@ -0,0 +1,282 @@
+"""Record/replay JSON-RPC cassettes for offline, deterministic bot runs.
+
+Record mode wraps the live transport and appends every request/response pair
+to a gzipped JSON-lines cassette. Replay mode serves those responses without
+a node, at the recorded latency or compressed by a speed factor. Compare the
+call pattern of two cassettes with:
+
+    python cassette.py stats before.rpc.gz after.rpc.gz
+"""
+import asyncio
+import gzip
+import json
+import os
+import sys
+import time
+from collections import Counter, defaultdict, deque
+from urllib.parse import urlsplit
+from eth_utils import keccak
+from rpc import json_default
+
+CASSETTE_VERSION = 1
+
+# Request params that must never be written to disk as-is
+REDACTED_METHODS = ("eth_sendRawTransaction",)
+
+# Lookups whose only param is a transaction hash; replayed transactions hash
+# differently from the recorded ones, so these only match through the
+# recorded-to-replayed hash mapping
+HASH_KEYED_METHODS = ("eth_getTransactionReceipt", "eth_getTransactionByHash")
+
+
+def redact_params(method, params):
+    """Replace signed payloads with their hash; the hash still identifies the tx"""
+    if method in REDACTED_METHODS and params:
+        raw = params[0]
+        raw = bytes.fromhex(raw[2:] if raw.startswith("0x") else raw) if isinstance(raw, str) else bytes(raw)
+        return ["redacted:0x" + keccak(raw).hex()]
+    return params
+
+
+def redact_endpoint(url):
+    """Keep only scheme and host; provider API keys live in the path or query"""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.hostname}" if parts.hostname else "unknown"
+
+
+def sender_and_nonce(raw_tx):
+    """(lowercased sender, nonce) of a signed raw transaction, or None"""
+    try:
+        import rlp
+        from eth_account import Account
+
+        raw = bytes.fromhex(raw_tx[2:] if raw_tx.startswith("0x") else raw_tx)
+        # Typed transactions lead with chainId; legacy ones with the nonce
+        fields = rlp.decode(raw[1:]) if raw[0] < 0x7F else rlp.decode(raw)
+        nonce = int.from_bytes(fields[1] if raw[0] < 0x7F else fields[0], "big")
+        return Account.recover_transaction(raw).lower(), nonce
+    except Exception:
+        return None
+
+
+def request_key(method, params):
+    return method + json.dumps(params, sort_keys=True, default=json_default)
+
+
+def _calls(payload):
+    return payload if isinstance(payload, list) else [payload]
+
+
+class RecordingTransport:
+    """Transport wrapper that appends redacted traffic to a cassette file"""
+
+    def __init__(self, inner, path, endpoint_uri=""):
+        self.inner = inner
+        self.path = path
+        self._file = gzip.open(path, "wt")
+        self._started = time.perf_counter()
+        self._write({
+            "version": CASSETTE_VERSION,
+            "endpoint": redact_endpoint(endpoint_uri),
+            "recorded_at": time.time(),
+        })
+
+    def _write(self, entry):
+        self._file.write(json.dumps(entry, separators=(",", ":"), default=json_default) + "\n")
+
+    async def __call__(self, payload):
+        started = time.perf_counter()
+        response = await self.inner(payload)
+        if self._file is not None:
+            self._write({
+                "at": round(started - self._started, 4),
+                "elapsed": round(time.perf_counter() - started, 4),
+                "batch": isinstance(payload, list),
+                "calls": [
+                    [item["method"], redact_params(item["method"], item.get("params", []))]
+                    for item in _calls(payload)
+                ],
+                "responses": [
+                    {k: v for k, v in item.items() if k in ("result", "error")}
+                    for item in _calls(response)
+                ],
+            })
+        return response
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def read_cassette(path):
+    """Return (header, entries) from a cassette file"""
+    with gzip.open(path, "rt") as f:
+        header = json.loads(f.readline())
+        if header.get("version") != CASSETTE_VERSION:
+            raise ValueError(f"{path}: unsupported cassette version {header.get('version')}")
+        return header, [json.loads(line) for line in f if line.strip()]
+
+
+class ReplayTransport:
+    """Serve recorded responses offline.
+
+    Calls are matched on method and params first, then fall back to the next
+    unused response recorded for the same method (signed transactions and
+    gas estimates differ between runs). Once a method's responses run out the
+    last one is repeated. Each replayed ``eth_sendRawTransaction`` is paired
+    with the recorded one from the same sender and nonce (known from recorded
+    ``eth_getTransactionByHash`` answers), else with the next recorded one in
+    order, and receipt and transaction lookups for its
+    hash are answered from the recorded hash's responses, rewritten to the
+    replayed hash; a lookup with no such match answers ``null`` (not mined)
+    rather than some other transaction's receipt. ``speed`` scales the
+    recorded latency: 1 replays it, 10 is ten times faster and 0 answers
+    immediately.
+    """
+
+    def __init__(self, path, speed=1.0):
+        self.path = path
+        self.speed = speed
+        self.header, entries = read_cassette(path)
+        self._items = []
+        self._by_key = defaultdict(deque)
+        self._by_method = defaultdict(deque)
+        self._last = {}
+        for entry in entries:
+            for (method, params), response in zip(entry["calls"], entry["responses"]):
+                index = len(self._items)
+                self._items.append((method, response, entry["elapsed"]))
+                self._by_key[request_key(method, params)].append(index)
+                self._by_method[method].append(index)
+        self._used = [False] * len(self._items)
+        self._recorded_hash = {}  # replayed tx hash -> recorded tx hash
+        self._sent_by_hash = {}  # recorded tx hash -> its eth_sendRawTransaction item
+        self._hash_by_nonce = {}  # (sender, nonce) -> recorded tx hash
+        for index, (method, response, _) in enumerate(self._items):
+            result = response.get("result")
+            if method == "eth_sendRawTransaction" and isinstance(result, str):
+                self._sent_by_hash.setdefault(result.lower(), index)
+            elif method == "eth_getTransactionByHash" and isinstance(result, dict) and "nonce" in result:
+                key = (result["from"].lower(), int(result["nonce"], 16))
+                # The last version sent with a nonce is the one that got mined
+                self._hash_by_nonce[key] = result["hash"].lower()
+        self.misses = Counter()
+
+    def _take(self, queue):
+        while queue and self._used[queue[0]]:
+            queue.popleft()
+        if queue:
+            index = queue.popleft()
+            self._used[index] = True
+            return index
+        return None
+
+    def _answer(self, item):
+        method = item["method"]
+        params = redact_params(method, item.get("params", []))
+        if method in HASH_KEYED_METHODS:
+            return self._answer_hash_lookup(method, params)
+        key = request_key(method, params)
+        index = self._take(self._by_key[key])
+        if index is None and method == "eth_sendRawTransaction":
+            index = self._take_same_nonce(item.get("params") or [None])
+        if index is None:
+            index = self._take(self._by_method[method])
+        if index is None:
+            index = self._last.get(key, self._last.get(method))
+        if index is None:
+            self.misses[method] += 1
+            return {"error": {"code": -32601, "message": f"{method} not in cassette"}}, 0.0
+        self._last[key] = self._last[method] = index
+        _, response, elapsed = self._items[index]
+        response = dict(response)
+        if method == "eth_sendRawTransaction" and params and isinstance(response.get("result"), str):
+            replayed = params[0][len("redacted:"):]
+            self._recorded_hash[replayed] = response["result"].lower()
+            response["result"] = replayed
+        return response, elapsed
+
+    def _take_same_nonce(self, params):
+        """The recorded send of the same sender and nonce, if it is still unused"""
+        if not isinstance(params[0], str):
+            return None
+        recorded = self._hash_by_nonce.get(sender_and_nonce(params[0]))
+        index = self._sent_by_hash.get(recorded)
+        if index is None or self._used[index]:
+            return None
+        self._used[index] = True
+        return index
+
+    def _answer_hash_lookup(self, method, params):
+        replayed = params[0].lower() if params else None
+        recorded = self._recorded_hash.get(replayed)
+        if recorded is None:
+            self.misses[method] += 1
+            return {"result": None}, 0.0
+        key = request_key(method, [recorded])
+        index = self._take(self._by_key[key])
+        if index is None:
+            index = self._last.get(key)
+        if index is None:
+            return {"result": None}, 0.0
+        self._last[key] = index
+        _, response, elapsed = self._items[index]
+        # Point the receipt (and its logs) at the transaction actually sent
+        return json.loads(json.dumps(response).replace(recorded, replayed)), elapsed
+
+    async def __call__(self, payload):
+        answers = [self._answer(item) for item in _calls(payload)]
+        if self.speed:
+            await asyncio.sleep(max(elapsed for _, elapsed in answers) / self.speed)
+        responses = [
+            {"jsonrpc": "2.0", "id": item["id"], **response}
+            for item, (response, _) in zip(_calls(payload), answers)
+        ]
+        return responses if isinstance(payload, list) else responses[0]
+
+    def close(self):
+        pass
+
+
+def install_cassette(client):
+    """Wrap the client's transport per RPC_RECORD / RPC_REPLAY, if either is set"""
+    record_path = os.getenv("RPC_RECORD")
+    replay_path = os.getenv("RPC_REPLAY")
+    if replay_path:
+        client.transport = ReplayTransport(replay_path, float(os.getenv("RPC_REPLAY_SPEED", "1")))
+    elif record_path:
+        client.transport = RecordingTransport(client.transport, record_path, client.endpoint_uri)
+    return client.transport
+
+
+def cassette_stats(path):
+    """Count HTTP round trips and JSON-RPC calls by method"""
+    _, entries = read_cassette(path)
+    methods = Counter(method for entry in entries for method, _ in entry["calls"])
+    return {
+        "http_requests": len(entries),
+        "rpc_calls": sum(methods.values()),
+        "rpc_time_s": round(sum(entry["elapsed"] for entry in entries), 3),
+        "methods": methods,
+    }
+
+
+def print_stats(paths):
+    stats = [cassette_stats(path) for path in paths]
+    width = max(len(name) for s in stats for name in s["methods"]) if stats else 20
+    print(f"{'':<{width}}" + "".join(f"{os.path.basename(p)[:14]:>16}" for p in paths))
+    for field in ("http_requests", "rpc_calls", "rpc_time_s"):
+        print(f"{field:<{width}}" + "".join(f"{s[field]:>16}" for s in stats))
+    print()
+    for method in sorted(set().union(*(s["methods"] for s in stats))):
+        counts = [s["methods"].get(method, 0) for s in stats]
+        delta = f"{counts[-1] - counts[0]:+d}" if len(counts) > 1 and counts[-1] != counts[0] else ""
+        print(f"{method:<{width}}" + "".join(f"{c:>16}" for c in counts) + f"  {delta}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] != "stats":
+        print("usage: python cassette.py stats CASSETTE [CASSETTE]")
+        sys.exit(2)
+    print_stats(sys.argv[2:])
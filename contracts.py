@@ -0,0 +1,146 @@
+import asyncio
+import json
+import os
+from eth_utils import to_checksum_address
+from abi_tables import SELECTORS
+from logs import get_logger
+
+log = get_logger(__name__)
+
+TOKEN_CACHE_FILE = "contract_cache.json"
+
+
+def _uint_word(value):
+    return value.to_bytes(32, "big")
+
+
+def _address_word(address):
+    return bytes(12) + bytes.fromhex(address[2:])
+
+
+def encode_call(name, *words):
+    """Selector plus pre-encoded 32-byte words, as 0x-prefixed calldata"""
+    return "0x" + (SELECTORS[name] + b"".join(words)).hex()
+
+
+def decode_uint(result):
+    return int(result[2:66] or "0", 16)
+
+
+def decode_address(result):
+    return to_checksum_address("0x" + result[26:66])
+
+
+class ContractCall:
+    """Pre-encoded contract call ready to become a transaction"""
+
+    __slots__ = ("name", "to", "data", "token_type")
+
+    def __init__(self, name, to, data, token_type=None):
+        self.name = name
+        self.to = to
+        self.data = data
+        self.token_type = token_type
+
+    @property
+    def selector(self):
+        return self.data[:10]
+
+
+class ContractRegistry:
+    """Builds contract objects once and keeps immutable pool reads for the process.
+
+    Bond/leverage token addresses are persisted to ``cache_file`` so restarts
+    skip the ``bondToken()``/``lToken()`` lookups. Hot-path calldata is built
+    from precomputed selectors without the web3 contract machinery; web3
+    contract objects are only built, through ``web3_factory``, on request.
+    """
+
+    def __init__(self, rpc, pool_address, wsteth_address, pool_abi, erc20_abi, cache_file=TOKEN_CACHE_FILE,
+                 web3_factory=None):
+        self.rpc = rpc
+        self.web3_factory = web3_factory
+        self.pool_address = to_checksum_address(pool_address)
+        self.wsteth_address = to_checksum_address(wsteth_address)
+        self.abis = {"pool": pool_abi, "erc20": erc20_abi}
+        self.cache_file = cache_file
+        self._contracts = {}
+        self._token_addresses = self._load_token_addresses()
+        self._lock = asyncio.Lock()
+
+    def contract(self, address, kind="erc20"):
+        """Return the cached web3 contract object for address"""
+        key = (to_checksum_address(address), kind)
+        if key not in self._contracts:
+            self._contracts[key] = self.web3_factory().eth.contract(address=key[0], abi=self.abis[kind])
+        return self._contracts[key]
+
+    def _load_token_addresses(self):
+        try:
+            with open(self.cache_file, "r") as f:
+                cached = json.load(f).get(self.pool_address)
+            if cached:
+                return {0: to_checksum_address(cached["bond"]), 1: to_checksum_address(cached["leverage"])}
+        except (OSError, ValueError, KeyError):
+            pass
+        return {}
+
+    def _save_token_addresses(self):
+        try:
+            data = {}
+            if os.path.exists(self.cache_file):
+                with open(self.cache_file, "r") as f:
+                    data = json.load(f)
+            data[self.pool_address] = {
+                "bond": self._token_addresses[0],
+                "leverage": self._token_addresses[1],
+            }
+            tmp_file = f"{self.cache_file}.tmp"
+            with open(tmp_file, "w") as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp_file, self.cache_file)
+        except (OSError, ValueError) as e:
+            log.warning(f"Could not persist token addresses: {str(e)}")
+
+    async def token_addresses(self):
+        """Bond (0) and leverage (1) token addresses, resolved once"""
+        if not self._token_addresses:
+            async with self._lock:
+                if not self._token_addresses:
+                    bond, leverage = await self.rpc.batch(
+                        [
+                            ("eth_call", [{"to": self.pool_address, "data": encode_call("bondToken")}, "latest"]),
+                            ("eth_call", [{"to": self.pool_address, "data": encode_call("lToken")}, "latest"]),
+                        ]
+                    )
+                    self._token_addresses = {
+                        0: decode_address(bond["result"]),
+                        1: decode_address(leverage["result"]),
+                    }
+                    self._save_token_addresses()
+        return self._token_addresses
+
+    async def token_address(self, token_type):
+        return (await self.token_addresses())[token_type]
+
+    # Hot-path encoders
+
+    def create(self, token_type, amount, min_amount=0):
+        data = encode_call("create", _uint_word(token_type), _uint_word(amount), _uint_word(min_amount))
+        return ContractCall("create", self.pool_address, data, token_type)
+
+    def redeem(self, token_type, amount, min_amount=0):
+        data = encode_call("redeem", _uint_word(token_type), _uint_word(amount), _uint_word(min_amount))
+        return ContractCall("redeem", self.pool_address, data, token_type)
+
+    def approve(self, token, spender, amount):
+        data = encode_call("approve", _address_word(spender), _uint_word(amount))
+        return ContractCall("approve", to_checksum_address(token), data)
+
+    @staticmethod
+    def balance_of_data(owner):
+        return encode_call("balanceOf", _address_word(owner))
+
+    @staticmethod
+    def allowance_data(owner, spender):
+        return encode_call("allowance", _address_word(owner), _address_word(spender))
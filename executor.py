@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import os
+import time
+from logs import SUCCESS, get_logger, wallet_context
+
+log = get_logger(__name__)
+
+DEFAULT_CONCURRENCY = 3
+
+
+class WalletResult:
+    """Outcome of one wallet in a cycle"""
+
+    __slots__ = ("index", "address", "status", "duration", "error")
+
+    def __init__(self, index, address, status, duration, error=None):
+        self.index = index
+        self.address = address
+        self.status = status  # "ok", "failed", "error", "skipped" or "cancelled"
+        self.duration = duration
+        self.error = error
+
+
+class CycleSummary:
+    """Per-cycle tally of wallet outcomes and durations"""
+
+    def __init__(self, results, wall_time):
+        self.results = sorted(results, key=lambda result: result.index)
+        self.wall_time = wall_time
+
+    def count(self, status):
+        return sum(1 for result in self.results if result.status == status)
+
+    @property
+    def durations(self):
+        return sorted(result.duration for result in self.results if result.status != "skipped")
+
+    def log(self):
+        durations = self.durations
+        failed = self.count("failed") + self.count("error")
+        log.log(
+            logging.ERROR if failed else SUCCESS,
+            f"=== Cycle summary === Succeeded: {self.count('ok')}  Failed: {failed}  "
+            f"Skipped: {self.count('skipped')}  Cancelled: {self.count('cancelled')}",
+            succeeded=self.count("ok"),
+            failed=failed,
+            skipped=self.count("skipped"),
+            cancelled=self.count("cancelled"),
+            wall_time=round(self.wall_time, 3),
+        )
+        if durations:
+            log.info(
+                f"Wallet time p50 {durations[len(durations) // 2]:.1f}s, "
+                f"max {durations[-1]:.1f}s, cycle wall time {self.wall_time:.1f}s"
+            )
+        for result in self.results:
+            if result.status in ("failed", "error"):
+                reason = f": {result.error}" if result.error else ""
+                log.error(
+                    f"  Wallet {result.index} {result.address} {result.status}{reason}",
+                    wallet=result.index,
+                    address=result.address,
+                )
+
+
+class WalletExecutor:
+    """Runs process_wallet for up to ``concurrency`` wallets at a time.
+
+    Each wallet's steps still run in order inside its own task, and a wallet
+    address never runs twice at once. An exception in one wallet is recorded
+    and does not touch the others. Cancelling ``run`` (Ctrl+C) cancels the
+    in-flight wallets, waits for them to unwind and re-raises; progress is
+    already in the state store, so the next run resumes.
+    """
+
+    def __init__(self, bot, concurrency=DEFAULT_CONCURRENCY):
+        self.bot = bot
+        self.concurrency = max(1, concurrency)
+
+    @classmethod
+    def from_env(cls, bot):
+        return cls(bot, int(os.getenv("WALLET_CONCURRENCY", str(DEFAULT_CONCURRENCY))))
+
+    async def _run_wallet(self, index, wallet, total):
+        started = time.perf_counter()
+        with wallet_context(index, wallet.address):
+            try:
+                ok = await self.bot.process_wallet(wallet, index, total)
+                status, error = ("ok" if ok else "failed"), None
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.error(f"Error processing wallet {index}: {str(e)}")
+                status, error = "error", str(e)
+            duration = time.perf_counter() - started
+            log.debug(f"Wallet {index} {status}", op="wallet", status=status, elapsed=round(duration, 3))
+        return WalletResult(index, wallet.address, status, duration, error)
+
+    async def _worker(self, queue, total, results, running):
+        while True:
+            try:
+                index, wallet = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            # Left in place if cancelled, so the summary can report it
+            running[wallet.address] = (index, time.perf_counter())
+            results.append(await self._run_wallet(index, wallet, total))
+            del running[wallet.address]
+
+    async def run(self, wallets):
+        """Process every wallet and return a CycleSummary"""
+        started = time.perf_counter()
+        results = []
+        queue = asyncio.Queue()
+        seen = set()
+        for index, wallet in enumerate(wallets, 1):
+            if wallet.address in seen or self.bot.wallet_completed(wallet):
+                log.success(f"Wallet {index} already completed or queued this cycle", wallet=index)
+                results.append(WalletResult(index, wallet.address, "skipped", 0.0))
+                continue
+            seen.add(wallet.address)
+            queue.put_nowait((index, wallet))
+
+        running = {}
+        workers = [
+            asyncio.create_task(self._worker(queue, len(wallets), results, running))
+            for _ in range(min(self.concurrency, queue.qsize()))
+        ]
+        try:
+            await asyncio.gather(*workers)
+        except asyncio.CancelledError:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            now = time.perf_counter()
+            for address, (index, wallet_started) in running.items():
+                results.append(WalletResult(index, address, "cancelled", now - wallet_started))
+            CycleSummary(results, now - started).log()
+            raise
+        return CycleSummary(results, time.perf_counter() - started)
@@ -0,0 +1,60 @@
+from collections import deque
+
+
+class GasLimitCache:
+    """Learns gas limits from confirmed receipts, keyed by (contract, selector, token_type).
+
+    Once a key has ``min_samples`` observations, ``limit_for`` returns the
+    ``percentile`` of recent gasUsed values padded by ``margin`` so callers can
+    skip estimate_gas. An out-of-gas revert clears the key so the next
+    transaction falls back to estimation.
+    """
+
+    def __init__(self, samples=50, min_samples=3, percentile=95, margin=1.1):
+        self.samples = samples
+        self.min_samples = min_samples
+        self.percentile = percentile
+        self.margin = margin
+        self._gas_used = {}
+        self._inflight = {}
+
+    @staticmethod
+    def key_for(call):
+        """Cache key for a ContractCall"""
+        return (call.to, call.selector, call.token_type)
+
+    def limit_for(self, key):
+        """Learned gas limit for key, or None on a cold cache"""
+        observed = self._gas_used.get(key)
+        if not observed or len(observed) < self.min_samples:
+            return None
+        ordered = sorted(observed)
+        index = min(len(ordered) - 1, (len(ordered) * self.percentile) // 100)
+        return int(ordered[index] * self.margin)
+
+    def track(self, tx_hash, key, gas_limit):
+        """Remember which key and limit a broadcast transaction used"""
+        self._inflight[tx_hash] = (key, gas_limit)
+
+    def track_replacement(self, tx_hash, replacement_hash):
+        """A same-nonce replacement uses the same key and limit"""
+        if tx_hash in self._inflight:
+            self._inflight[replacement_hash] = self._inflight[tx_hash]
+
+    def forget(self, tx_hashes):
+        """Stop tracking transactions whose receipts will never be observed"""
+        for tx_hash in tx_hashes:
+            self._inflight.pop(tx_hash, None)
+
+    def observe(self, receipt):
+        """Learn from a confirmed receipt of a tracked transaction"""
+        tracked = self._inflight.pop(receipt["transactionHash"], None)
+        if tracked is None:
+            return
+        key, gas_limit = tracked
+        gas_used = int(receipt["gasUsed"], 16)
+        if int(receipt["status"], 16) == 1:
+            self._gas_used.setdefault(key, deque(maxlen=self.samples)).append(gas_used)
+        elif gas_used >= gas_limit * 0.97:
+            # Ran out of gas: stop trusting the learned limit for this call
+            self._gas_used.pop(key, None)
@@ -0,0 +1,98 @@
+import asyncio
+import time
+from dataclasses import dataclass
+
+GWEI = 10**9
+
+
+@dataclass
+class FeeData:
+    """Next-block base fee and suggested priority fee, in wei"""
+
+    base_fee: int
+    priority_fee: int
+    fetched_at: float
+
+    @property
+    def gas_price(self):
+        return self.base_fee + self.priority_fee
+
+
+class GasOracle:
+    """Caches chain id forever and EIP-1559 fee data for a short TTL.
+
+    Fee data comes from one ``eth_feeHistory`` call: the next block's base fee
+    plus the median of the requested reward percentile over recent blocks.
+    ``on_block`` marks the cache stale so a new block triggers a refresh.
+    """
+
+    def __init__(
+        self,
+        rpc,
+        ttl=6.0,
+        history_blocks=10,
+        percentile=50,
+        max_gas_price=1 * GWEI,
+        min_priority_fee=GWEI // 1000,
+    ):
+        self.rpc = rpc
+        self.ttl = ttl
+        self.history_blocks = history_blocks
+        self.percentile = percentile
+        self.max_gas_price = max_gas_price
+        self.min_priority_fee = min_priority_fee
+        self._chain_id = None
+        self._fees = None
+        self._stale = True
+        self._lock = asyncio.Lock()
+
+    def on_block(self, block_number):
+        self._stale = True
+
+    async def chain_id(self):
+        if self._chain_id is None:
+            self._chain_id = int(await self.rpc.call("eth_chainId"), 16)
+        return self._chain_id
+
+    def _fresh(self):
+        if self._fees is None:
+            return False
+        age = time.monotonic() - self._fees.fetched_at
+        # A new block only forces a refresh once the data is at least a second old
+        return age < self.ttl and not (self._stale and age >= 1.0)
+
+    async def fees(self):
+        """Return cached FeeData, refreshing it at most once per concurrent burst"""
+        if self._fresh():
+            return self._fees
+        async with self._lock:
+            if self._fresh():
+                return self._fees
+            history = await self.rpc.call(
+                "eth_feeHistory", [hex(self.history_blocks), "latest", [self.percentile]]
+            )
+            base_fee = int(history["baseFeePerGas"][-1], 16)
+            rewards = sorted(int(reward[0], 16) for reward in history.get("reward") or [] if reward)
+            priority_fee = rewards[len(rewards) // 2] if rewards else 0
+            priority_fee = max(priority_fee, self.min_priority_fee)
+            self._fees = FeeData(base_fee, priority_fee, time.monotonic())
+            self._stale = False
+            return self._fees
+
+    async def fee_params(self):
+        """EIP-1559 fee fields for a type-2 transaction"""
+        fees = await self.fees()
+        return {
+            # Headroom for the base fee doubling before inclusion
+            "maxFeePerGas": 2 * fees.base_fee + fees.priority_fee,
+            "maxPriorityFeePerGas": fees.priority_fee,
+        }
+
+    async def gas_price(self):
+        return (await self.fees()).gas_price
+
+    async def is_acceptable(self, gas_price=None):
+        """Check the effective gas price against max_gas_price"""
+        if gas_price is None:
+            gas_price = await self.gas_price()
+        return gas_price <= self.max_gas_price
@@ -0,0 +1,165 @@
+"""Generate abi_tables.py: the bot's ABIs, checksummed addresses and selectors.
+
+Everything the bot needs from an ABI at startup is computed here once and
+written out as plain literals, so importing it costs no hashing and no
+web3. Edit the ABIs below, then regenerate and commit the result:
+
+    python gen_abi_tables.py           # rewrite abi_tables.py
+    python gen_abi_tables.py --check   # exit 1 if abi_tables.py is stale
+"""
+import argparse
+import pprint
+import sys
+from eth_utils import event_abi_to_log_topic, keccak, to_checksum_address
+
+OUTPUT = "abi_tables.py"
+
+CONTRACT_ADDRESS = "0x47129e886b44B5b8815e6471FCD7b31515d83242"
+WSTETH_ADDRESS = "0x13e5fb0b6534bb22cbc59fae339dbbe0dc906871"
+
+CONTRACT_ABI = [
+    {
+        "inputs": [],
+        "name": "bondToken",
+        "outputs": [{"internalType": "address", "name": "", "type": "address"}],
+        "stateMutability": "view",
+        "type": "function",
+    },
+    {
+        "inputs": [],
+        "name": "lToken",
+        "outputs": [{"internalType": "address", "name": "", "type": "address"}],
+        "stateMutability": "view",
+        "type": "function",
+    },
+    {
+        "inputs": [
+            {"internalType": "enum Pool.TokenType", "name": "tokenType", "type": "uint8"},
+            {"internalType": "uint256", "name": "depositAmount", "type": "uint256"},
+            {"internalType": "uint256", "name": "minAmount", "type": "uint256"},
+        ],
+        "name": "create",
+        "outputs": [{"internalType": "uint256", "name": "", "type": "uint256"}],
+        "stateMutability": "nonpayable",
+        "type": "function",
+    },
+    {
+        "inputs": [
+            {"internalType": "enum Pool.TokenType", "name": "tokenType", "type": "uint8"},
+            {"internalType": "uint256", "name": "depositAmount", "type": "uint256"},
+            {"internalType": "uint256", "name": "minAmount", "type": "uint256"},
+        ],
+        "name": "redeem",
+        "outputs": [{"internalType": "uint256", "name": "", "type": "uint256"}],
+        "stateMutability": "nonpayable",
+        "type": "function",
+    },
+]
+
+ERC20_ABI = [
+    {
+        "constant": True,
+        "inputs": [
+            {"name": "_owner", "type": "address"},
+            {"name": "_spender", "type": "address"},
+        ],
+        "name": "allowance",
+        "outputs": [{"name": "remaining", "type": "uint256"}],
+        "type": "function",
+    },
+    {
+        "constant": False,
+        "inputs": [
+            {"name": "_spender", "type": "address"},
+            {"name": "_value", "type": "uint256"},
+        ],
+        "name": "approve",
+        "outputs": [{"name": "success", "type": "bool"}],
+        "type": "function",
+    },
+    {
+        "constant": True,
+        "inputs": [{"name": "_owner", "type": "address"}],
+        "name": "balanceOf",
+        "outputs": [{"name": "balance", "type": "uint256"}],
+        "type": "function",
+    },
+]
+
+TRANSFER_EVENT = {
+    "anonymous": False,
+    "inputs": [
+        {"indexed": True, "name": "from", "type": "address"},
+        {"indexed": True, "name": "to", "type": "address"},
+        {"indexed": False, "name": "value", "type": "uint256"},
+    ],
+    "name": "Transfer",
+    "type": "event",
+}
+
+# Calls made outside the two ABIs
+EXTRA_SIGNATURES = {
+    "aggregate3": "aggregate3((address,bool,bytes)[])",
+}
+
+
+def _signature(item):
+    return f"{item['name']}({','.join(arg['type'] for arg in item['inputs'])})"
+
+
+def signatures():
+    """Function name -> canonical signature for every call the bot makes"""
+    found = {
+        item["name"]: _signature(item)
+        for item in CONTRACT_ABI + ERC20_ABI
+        if item.get("type") == "function"
+    }
+    found.update(EXTRA_SIGNATURES)
+    return dict(sorted(found.items()))
+
+
+def _render_selectors():
+    lines = [
+        f"    {name!r}: bytes.fromhex({keccak(text=signature)[:4].hex()!r}),  # {signature}"
+        for name, signature in signatures().items()
+    ]
+    return "SELECTORS = {\n" + "\n".join(lines) + "\n}"
+
+
+def render():
+    sections = [
+        '"""Generated by gen_abi_tables.py from its ABI definitions; do not edit."""',
+        f"CONTRACT_ADDRESS = {to_checksum_address(CONTRACT_ADDRESS)!r}",
+        f"WSTETH_ADDRESS = {to_checksum_address(WSTETH_ADDRESS)!r}",
+        f"CONTRACT_ABI = {pprint.pformat(CONTRACT_ABI, sort_dicts=False)}",
+        f"ERC20_ABI = {pprint.pformat(ERC20_ABI, sort_dicts=False)}",
+        f"TRANSFER_EVENT = {pprint.pformat(TRANSFER_EVENT, sort_dicts=False)}",
+        f"TRANSFER_TOPIC = {'0x' + event_abi_to_log_topic(TRANSFER_EVENT).hex()!r}",
+        "# 4-byte function selectors by name\n" + _render_selectors(),
+    ]
+    return "\n\n".join(sections) + "\n"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--check", action="store_true", help=f"fail if {OUTPUT} is out of date")
+    args = parser.parse_args(argv)
+    source = render()
+    if args.check:
+        try:
+            with open(OUTPUT, "r") as f:
+                current = f.read()
+        except OSError:
+            current = None
+        if current != source:
+            print(f"{OUTPUT} is out of date, run: python gen_abi_tables.py", file=sys.stderr)
+            return 1
+        return 0
+    with open(OUTPUT, "w") as f:
+        f.write(source)
+    print(f"Wrote {OUTPUT}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,312 @@
+import json
+import os
+from eth_utils import to_checksum_address
+from abi_tables import TRANSFER_TOPIC
+from multicall import MulticallReader
+from positions import LogDecoder
+from rpc import RpcError
+from logs import get_logger
+
+log = get_logger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS index_checkpoint (
+    name TEXT PRIMARY KEY,
+    block_number INTEGER NOT NULL,
+    block_hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS index_blocks (
+    block_number INTEGER PRIMARY KEY,
+    block_hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS index_wallets (
+    address TEXT PRIMARY KEY,
+    added_block INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS index_balances (
+    address TEXT NOT NULL,
+    token TEXT NOT NULL,
+    balance TEXT NOT NULL,
+    PRIMARY KEY (address, token)
+);
+CREATE TABLE IF NOT EXISTS transfers (
+    block_number INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    tx_hash TEXT NOT NULL,
+    token TEXT NOT NULL,
+    sender TEXT NOT NULL,
+    recipient TEXT NOT NULL,
+    amount TEXT NOT NULL,
+    PRIMARY KEY (tx_hash, log_index)
+);
+CREATE INDEX IF NOT EXISTS transfers_sender ON transfers (sender);
+CREATE INDEX IF NOT EXISTS transfers_recipient ON transfers (recipient);
+CREATE INDEX IF NOT EXISTS transfers_block ON transfers (block_number);
+CREATE TABLE IF NOT EXISTS pool_events (
+    block_number INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    tx_hash TEXT NOT NULL,
+    name TEXT NOT NULL,
+    args TEXT NOT NULL,
+    PRIMARY KEY (tx_hash, log_index)
+);
+CREATE INDEX IF NOT EXISTS pool_events_block ON pool_events (block_number);
+"""
+
+CHECKPOINT = "plaza"
+
+
+def _address_topic(address):
+    return "0x" + "0" * 24 + address[2:].lower()
+
+
+class EventIndexer:
+    """Incrementally indexes Transfer logs of our wallets and Pool events into SQLite.
+
+    Pages ``eth_getLogs`` from the last checkpoint to ``confirmations``
+    blocks behind the head, halving the block range when a node rejects a
+    query and doubling it back after quiet pages. The hash of every page's
+    last block is kept so a reorg is detected on the next sync and the index
+    rolled back to the newest block still on the canonical chain. A wallet's
+    balances are read with ``balanceOf`` at the block it joins the index;
+    its positions are those balances plus the transfers indexed after that
+    block, so no history has to be scanned or assumed empty. A wallet left
+    out of a sync leaves the index and is seeded again if it returns. Pool
+    events are indexed from ``start_block``, by default the head at the
+    first sync.
+    """
+
+    def __init__(self, rpc, state, tokens, pool_address, pool_abi=(), start_block=None, multicall=None,
+                 confirmations=3, block_range=2000, max_range=10_000, wallet_chunk=50, keep_blocks=256):
+        self.rpc = rpc
+        self.multicall = multicall or MulticallReader(rpc)
+        self.state = state
+        self.conn = state.conn
+        self.tokens = [to_checksum_address(token) for token in tokens]
+        self.pool_address = to_checksum_address(pool_address)
+        self.decoder = LogDecoder(pool_abi)
+        self.pool_topics = [topic for topic in self.decoder.events if topic != TRANSFER_TOPIC]
+        self.start_block = start_block
+        self.confirmations = confirmations
+        self.block_range = block_range
+        self.max_range = max_range
+        self.wallet_chunk = wallet_chunk
+        self.keep_blocks = keep_blocks
+        self.conn.executescript(SCHEMA)
+
+    @classmethod
+    def from_env(cls, rpc, state, tokens, pool_address, pool_abi=(), multicall=None):
+        start_block = os.getenv("INDEX_START_BLOCK")
+        return cls(rpc, state, tokens, pool_address, pool_abi, int(start_block) if start_block else None, multicall)
+
+    def checkpoint(self):
+        """(block_number, block_hash) of the last indexed block, or None"""
+        return self.conn.execute(
+            "SELECT block_number, block_hash FROM index_checkpoint WHERE name = ?", (CHECKPOINT,)
+        ).fetchone()
+
+    async def sync(self, wallets):
+        """Bring the index up to date for wallets; returns the indexed head block"""
+        wallets = [to_checksum_address(wallet) for wallet in wallets]
+        head = int(await self.rpc.call("eth_blockNumber"), 16) - self.confirmations
+        checkpoint = self.checkpoint()
+        if checkpoint is not None:
+            checkpoint = await self._check_reorg(checkpoint)
+
+        known = {row[0] for row in self.conn.execute("SELECT DISTINCT address FROM index_balances")}
+        # Only the wallets passed in are scanned from here on; one that comes
+        # back later is seeded again instead of missing the blocks in between
+        gone = known.difference(wallets)
+        if gone:
+            self._drop(gone)
+        new = [wallet for wallet in wallets if wallet not in known]
+        if new:
+            await self._seed(new, head)
+
+        if checkpoint is not None:
+            start = checkpoint[0] + 1
+        else:
+            start = min(head, self.start_block) if self.start_block is not None else head
+        if start <= head:
+            await self._scan(wallets, start, head, move_checkpoint=True)
+        return head
+
+    async def _seed(self, wallets, block):
+        """Record wallets' token balances at ``block``; later transfers are applied on top"""
+        table = await self.multicall.read_tokens({token: token for token in self.tokens}, wallets, block=hex(block))
+        rows = []
+        for index, wallet in enumerate(wallets):
+            balances = table.row(index)
+            if None in balances.values():
+                # Unknown is not zero: leave the wallet out until it can be read
+                raise RpcError("balanceOf", {"message": f"no balances for {wallet} at block {block}"})
+            rows.extend((wallet, token, str(balance)) for token, balance in balances.items())
+        with self.state.transaction():
+            self.conn.executemany("INSERT OR REPLACE INTO index_balances VALUES (?, ?, ?)", rows)
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO index_wallets (address, added_block) VALUES (?, ?)",
+                [(wallet, block) for wallet in wallets],
+            )
+
+    def _drop(self, wallets):
+        """Forget wallets' seeds; their positions are unknown until they are seeded again"""
+        rows = [(wallet,) for wallet in wallets]
+        with self.state.transaction():
+            self.conn.executemany("DELETE FROM index_balances WHERE address = ?", rows)
+            self.conn.executemany("DELETE FROM index_wallets WHERE address = ?", rows)
+
+    async def _check_reorg(self, checkpoint):
+        """Roll back to the newest stored block whose hash still matches the chain"""
+        number, block_hash = checkpoint
+        if await self._block_hash(number) == block_hash:
+            return checkpoint
+        stored = self.conn.execute(
+            "SELECT block_number, block_hash FROM index_blocks WHERE block_number < ? "
+            "ORDER BY block_number DESC",
+            (number,),
+        ).fetchall()
+        for ancestor, ancestor_hash in stored:
+            if await self._block_hash(ancestor) == ancestor_hash:
+                log.warning(f"Reorg detected at block {number}, index rolled back to {ancestor}")
+                self._rollback(ancestor, ancestor_hash)
+                return ancestor, ancestor_hash
+        log.warning("Reorg deeper than the stored block hashes, reindexing from scratch")
+        self._rollback(-1, None)
+        return None
+
+    def _rollback(self, block_number, block_hash):
+        with self.state.transaction():
+            for table in ("transfers", "pool_events", "index_blocks"):
+                self.conn.execute(f"DELETE FROM {table} WHERE block_number > ?", (block_number,))
+            # Balances read at a block that is gone are reread on the next sync
+            self.conn.execute(
+                "DELETE FROM index_balances WHERE address IN "
+                "(SELECT address FROM index_wallets WHERE added_block > ?)",
+                (block_number,),
+            )
+            self.conn.execute("DELETE FROM index_wallets WHERE added_block > ?", (block_number,))
+            if block_hash is None:
+                self.conn.execute("DELETE FROM index_checkpoint WHERE name = ?", (CHECKPOINT,))
+            else:
+                self.conn.execute(
+                    "UPDATE index_checkpoint SET block_number = ?, block_hash = ? WHERE name = ?",
+                    (block_number, block_hash, CHECKPOINT),
+                )
+
+    async def _block_hash(self, number):
+        block = await self.rpc.call("eth_getBlockByNumber", [hex(number), False])
+        return block["hash"] if block else None
+
+    def _queries(self, wallets, start, stop):
+        span = {"fromBlock": hex(start), "toBlock": hex(stop)}
+        queries = []
+        for i in range(0, len(wallets), self.wallet_chunk):
+            topics = [_address_topic(wallet) for wallet in wallets[i : i + self.wallet_chunk]]
+            queries.append({**span, "address": self.tokens, "topics": [TRANSFER_TOPIC, topics]})
+            queries.append({**span, "address": self.tokens, "topics": [TRANSFER_TOPIC, None, topics]})
+        if self.pool_topics:
+            queries.append({**span, "address": self.pool_address, "topics": [self.pool_topics]})
+        return queries
+
+    async def _scan(self, wallets, start, end, move_checkpoint):
+        while start <= end:
+            stop = min(end, start + self.block_range - 1)
+            queries = self._queries(wallets, start, stop)
+            responses = await self.rpc.batch(
+                [("eth_getLogs", [query]) for query in queries]
+                + [("eth_getBlockByNumber", [hex(stop), False])]
+            )
+            errors = [response["error"] for response in responses[:-1] if "error" in response]
+            if errors:
+                if self.block_range == 1:
+                    raise RpcError("eth_getLogs", errors[0])
+                # Too many results or too wide a range: retry a narrower page
+                # and don't grow past it again
+                self.block_range = max(1, self.block_range // 2)
+                self.max_range = self.block_range
+                continue
+            logs = {}
+            for response in responses[:-1]:
+                for log in response["result"]:
+                    # A transfer between two of our wallets matches both queries
+                    logs[(log["transactionHash"], int(log["logIndex"], 16))] = log
+            stop_hash = (responses[-1].get("result") or {}).get("hash")
+            self._store(logs.values(), stop, stop_hash, move_checkpoint)
+            if len(logs) < 1000:
+                self.block_range = min(self.max_range, self.block_range * 2)
+            start = stop + 1
+
+    def _store(self, logs, stop, stop_hash, move_checkpoint):
+        transfers, events, blocks = [], [], {}
+        for log in logs:
+            decoded = self.decoder.decode(log)
+            if decoded is None:
+                continue
+            name, address, args = decoded
+            block_number = int(log["blockNumber"], 16)
+            log_index = int(log["logIndex"], 16)
+            blocks[block_number] = log["blockHash"]
+            if name == "Transfer" and address in self.tokens:
+                transfers.append((
+                    block_number, log_index, log["transactionHash"], address,
+                    to_checksum_address(args["from"]), to_checksum_address(args["to"]), str(args["value"]),
+                ))
+            elif address == self.pool_address:
+                events.append((
+                    block_number, log_index, log["transactionHash"], name,
+                    json.dumps(args, default=str),
+                ))
+        if move_checkpoint and stop_hash:
+            blocks[stop] = stop_hash
+        with self.state.transaction():
+            self.conn.executemany("INSERT OR REPLACE INTO transfers VALUES (?, ?, ?, ?, ?, ?, ?)", transfers)
+            self.conn.executemany("INSERT OR REPLACE INTO pool_events VALUES (?, ?, ?, ?, ?)", events)
+            self.conn.executemany("INSERT OR REPLACE INTO index_blocks VALUES (?, ?)", blocks.items())
+            if move_checkpoint and stop_hash:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO index_checkpoint VALUES (?, ?, ?)", (CHECKPOINT, stop, stop_hash)
+                )
+                self.conn.execute(
+                    "DELETE FROM index_blocks WHERE block_number NOT IN "
+                    "(SELECT block_number FROM index_blocks ORDER BY block_number DESC LIMIT ?)",
+                    (self.keep_blocks,),
+                )
+
+    def positions(self, wallets):
+        """{wallet: {token: balance}}: seeded balances plus the transfers indexed since"""
+        wallets = [to_checksum_address(wallet) for wallet in wallets]
+        placeholders = ",".join("?" * len(wallets))
+        seeded = dict(self.conn.execute(
+            f"SELECT address, added_block FROM index_wallets WHERE address IN ({placeholders})", wallets
+        ))
+        missing = [wallet for wallet in wallets if wallet not in seeded]
+        if missing:
+            raise ValueError(f"{len(missing)} wallets not indexed yet, sync them first")
+        balances = {wallet: dict.fromkeys(self.tokens, 0) for wallet in wallets}
+        for address, token, balance in self.conn.execute(
+            f"SELECT address, token, balance FROM index_balances WHERE address IN ({placeholders})", wallets
+        ):
+            if token in balances[address]:
+                balances[address][token] = int(balance)
+        rows = self.conn.execute(
+            f"SELECT block_number, token, sender, recipient, amount FROM transfers "
+            f"WHERE sender IN ({placeholders}) OR recipient IN ({placeholders})",
+            wallets + wallets,
+        )
+        for block_number, token, sender, recipient, amount in rows:
+            # Transfers up to a wallet's seed block are already in its balance
+            if sender in balances and block_number > seeded[sender]:
+                balances[sender][token] -= int(amount)
+            if recipient in balances and block_number > seeded[recipient]:
+                balances[recipient][token] += int(amount)
+        return balances
+
+    def portfolio(self, wallets):
+        """Total balance per token across wallets, and how many wallets hold each"""
+        totals = dict.fromkeys(self.tokens, 0)
+        holders = dict.fromkeys(self.tokens, 0)
+        for balances in self.positions(wallets).values():
+            for token, balance in balances.items():
+                totals[token] += balance
+                holders[token] += 1 if balance > 0 else 0
+        return totals, holders
@@ -0,0 +1,182 @@
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from colorama import Fore, Style, just_fix_windows_console
+
+LOG_FILE = "plaza_bot.log"
+
+# Between INFO and WARNING: the green "it worked" lines
+SUCCESS = 25
+logging.addLevelName(SUCCESS, "SUCCESS")
+
+COLORS = {
+    logging.DEBUG: Style.DIM,
+    logging.INFO: Fore.YELLOW,
+    SUCCESS: Fore.GREEN,
+    logging.WARNING: Fore.YELLOW,
+    logging.ERROR: Fore.RED,
+    logging.CRITICAL: Fore.RED + Style.BRIGHT,
+}
+
+# The wallet the current task is working on: (index, address)
+WALLET = contextvars.ContextVar("plaza_wallet", default=None)
+
+_RESERVED = ("exc_info", "stack_info", "stacklevel", "extra")
+
+
+class BotLogger(logging.LoggerAdapter):
+    """Logger taking structured fields as keywords: log.info("Sent", op="create", tx_hash=h)"""
+
+    def process(self, msg, kwargs):
+        fields = {key: kwargs.pop(key) for key in list(kwargs) if key not in _RESERVED}
+        kwargs.setdefault("extra", {})["fields"] = fields
+        return msg, kwargs
+
+    def success(self, msg, *args, **kwargs):
+        self.log(SUCCESS, msg, *args, **kwargs)
+
+
+def get_logger(name):
+    return BotLogger(logging.getLogger(f"plaza.{name}"))
+
+
+class wallet_context:
+    """Tag every record logged by the current task with a wallet"""
+
+    def __init__(self, index, address):
+        self.value = (index, address)
+        self.token = None
+
+    def __enter__(self):
+        self.token = WALLET.set(self.value)
+        return self
+
+    def __exit__(self, *exc):
+        WALLET.reset(self.token)
+
+
+class ContextFilter(logging.Filter):
+    """Stamps records with the task's wallet and structured fields.
+
+    Runs on the enqueueing side, where the asyncio task's context is still
+    visible; the listener thread only sees the finished record.
+    """
+
+    def filter(self, record):
+        fields = getattr(record, "fields", None) or {}
+        wallet = WALLET.get()
+        if wallet is not None:
+            fields.setdefault("wallet", wallet[0])
+            fields.setdefault("address", wallet[1])
+        record.fields = fields
+        return True
+
+
+class Coalescer(logging.Filter):
+    """Drops repeats of records logged with a ``coalesce`` key.
+
+    The first record for a (key, wallet) pair passes; further ones within
+    ``window`` seconds are counted and dropped, and the next one let through
+    carries the count in its ``suppressed`` field.
+    """
+
+    def __init__(self, window=30.0):
+        super().__init__()
+        self.window = window
+        self._seen = {}  # (key, wallet) -> (last emitted, suppressed)
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        key = record.fields.pop("coalesce", None)
+        if key is None:
+            return True
+        key = (key, record.fields.get("wallet"))
+        now = time.monotonic()
+        with self._lock:
+            last, suppressed = self._seen.get(key, (None, 0))
+            if last is not None and now - last < self.window:
+                self._seen[key] = (last, suppressed + 1)
+                return False
+            self._seen[key] = (now, 0)
+        if suppressed:
+            record.fields["suppressed"] = suppressed
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and fields"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", None) or {})
+        return json.dumps(entry, default=str)
+
+
+class ConsoleFormatter(logging.Formatter):
+    """The colored lines the bot always printed, prefixed with the wallet under concurrency"""
+
+    def format(self, record):
+        fields = getattr(record, "fields", None) or {}
+        message = record.getMessage()
+        if "wallet" in fields:
+            message = f"[W{fields['wallet']}] {message}"
+        if fields.get("suppressed"):
+            message += f" ({fields['suppressed']} similar suppressed)"
+        return f"{COLORS.get(record.levelno, '')}{message}{Style.RESET_ALL}"
+
+
+def setup_logging(path=None, console=None, level=None):
+    """Route all logging through a queue to a background listener thread.
+
+    Callers only pay for formatting the message and a put on an unbounded
+    queue; the listener thread does the JSON encoding, file writes (rotated
+    at LOG_MAX_BYTES, LOG_BACKUPS kept) and console output. Returns the
+    started QueueListener; stop it at shutdown to flush what is queued.
+    """
+    path = path if path is not None else os.getenv("LOG_FILE", LOG_FILE)
+    if console is None:
+        console = os.getenv("LOG_CONSOLE", "1").lower() not in ("0", "false", "no")
+    handlers = []
+    if path:
+        file_handler = logging.handlers.RotatingFileHandler(
+            path,
+            maxBytes=int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+            backupCount=int(os.getenv("LOG_BACKUPS", "5")),
+            encoding="utf-8",
+        )
+        file_handler.setFormatter(JsonFormatter())
+        handlers.append(file_handler)
+    if console:
+        just_fix_windows_console()
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(ConsoleFormatter())
+        handlers.append(console_handler)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+    queue_handler.addFilter(Coalescer(float(os.getenv("LOG_COALESCE_SECONDS", "30"))))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    # Libraries (aiohttp access lines, web3) only get through with warnings
+    root.setLevel(logging.WARNING)
+    logging.getLogger("plaza").setLevel(level or os.getenv("LOG_LEVEL", "INFO").upper())
+
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
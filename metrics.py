@@ -0,0 +1,205 @@
+import asyncio
+import bisect
+import os
+import time
+from contextlib import contextmanager
+from logs import get_logger
+
+log = get_logger(__name__)
+
+# Latency buckets in seconds, from sub-millisecond RPCs to multi-minute confirmations
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0,
+)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style"""
+
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """Approximate quantile: upper bound of the bucket holding it"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        running = 0
+        for bound, count in zip(self.buckets, self.counts):
+            running += count
+            if running >= target:
+                return bound
+        return float("inf")
+
+
+class MetricsRegistry:
+    """In-process histograms, counters and per-transaction lifecycle marks"""
+
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+        self.help = {}
+        self._tx_marks = {}
+
+    @staticmethod
+    def _key(name, labels):
+        return (name, tuple(sorted(labels.items())))
+
+    def describe(self, name, text):
+        self.help[name] = text
+
+    def observe(self, name, value, **labels):
+        key = self._key(name, labels)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        histogram.observe(value)
+
+    def inc(self, name, amount=1, **labels):
+        key = self._key(name, labels)
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    @contextmanager
+    def timer(self, name, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def tx_broadcast(self, tx_hash):
+        """Mark when a transaction was broadcast; later phases are timed from here"""
+        self._tx_marks[tx_hash] = time.perf_counter()
+
+    def tx_replaced(self, tx_hash, replacement_hash):
+        """Time a replacement from the original broadcast, whichever version is mined"""
+        if tx_hash in self._tx_marks:
+            self._tx_marks[replacement_hash] = self._tx_marks[tx_hash]
+
+    def tx_forget(self, tx_hashes):
+        """Drop the marks of transactions whose remaining phases will never be seen"""
+        for tx_hash in tx_hashes:
+            self._tx_marks.pop(tx_hash, None)
+
+    def tx_phase(self, tx_hash, phase, final=False):
+        """Observe the time from broadcast to phase (first_seen, mined)"""
+        started = self._tx_marks.pop(tx_hash, None) if final else self._tx_marks.get(tx_hash)
+        if started is not None:
+            self.observe("plaza_tx_phase_seconds", time.perf_counter() - started, phase=phase)
+
+    @staticmethod
+    def _labels(labels, extra=()):
+        pairs = list(labels) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+    def render(self):
+        """Render everything in the Prometheus text exposition format"""
+        lines = []
+        described = set()
+
+        def header(name, kind):
+            if name not in described:
+                described.add(name)
+                if name in self.help:
+                    lines.append(f"# HELP {name} {self.help[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in sorted(self.counters.items()):
+            header(name, "counter")
+            lines.append(f"{name}{self._labels(labels)} {value}")
+
+        for (name, labels), histogram in sorted(self.histograms.items()):
+            header(name, "histogram")
+            running = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                running += count
+                lines.append(f"{name}_bucket{self._labels(labels, [('le', bound)])} {running}")
+            lines.append(f"{name}_bucket{self._labels(labels, [('le', '+Inf')])} {histogram.count}")
+            lines.append(f"{name}_sum{self._labels(labels)} {histogram.sum:.6f}")
+            lines.append(f"{name}_count{self._labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+METRICS.describe("plaza_rpc_request_seconds", "JSON-RPC round trip latency by method")
+METRICS.describe("plaza_rpc_requests_total", "JSON-RPC calls by method, including batched calls")
+METRICS.describe("plaza_rpc_errors_total", "JSON-RPC calls that failed, by method")
+METRICS.describe("plaza_tx_phase_seconds", "Transaction lifecycle timings by phase")
+METRICS.describe("plaza_retries_total", "Retries by call site")
+METRICS.describe("plaza_rpc_endpoint_seconds", "HTTP round trip latency by RPC endpoint")
+METRICS.describe("plaza_rpc_endpoint_errors_total", "Transport failures by RPC endpoint")
+METRICS.describe("plaza_rpc_hedges_total", "Hedged read requests by the endpoint raced in")
+METRICS.describe("plaza_rpc_throttled_total", "429s, rate-limit errors and timeouts by RPC endpoint")
+METRICS.describe("plaza_preflight_reverts_total", "Simulated transactions that would revert, by kind")
+METRICS.describe("plaza_tx_replacements_total", "Stuck transactions re-signed at the same nonce with higher fees")
+
+
+class MetricsExporter:
+    """Serves METRICS over HTTP and/or writes it to a Prometheus text file"""
+
+    def __init__(self, registry=METRICS, port=None, path=None, interval=15.0):
+        self.registry = registry
+        self.port = port
+        self.path = path
+        self.interval = interval
+        self._runner = None
+        self._task = None
+
+    @classmethod
+    def from_env(cls, registry=METRICS):
+        port = os.getenv("METRICS_PORT")
+        return cls(registry, port=int(port) if port else None, path=os.getenv("METRICS_FILE"))
+
+    async def start(self):
+        if self.port:
+            from aiohttp import web
+
+            async def handle(request):
+                return web.Response(text=self.registry.render(), content_type="text/plain")
+
+            app = web.Application()
+            app.router.add_get("/metrics", handle)
+            self._runner = web.AppRunner(app)
+            await self._runner.setup()
+            await web.TCPSite(self._runner, "127.0.0.1", self.port).start()
+            log.info(f"Metrics on http://127.0.0.1:{self.port}/metrics")
+        if self.path:
+            self._task = asyncio.create_task(self._write_forever())
+
+    def write(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.registry.render())
+        os.replace(tmp_path, self.path)
+
+    async def _write_forever(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.write()
+            except OSError as e:
+                log.warning(f"Could not write metrics: {str(e)}", coalesce="metrics-write")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+            try:
+                self.write()
+            except OSError:
+                pass
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,89 @@
+from eth_abi import decode, encode
+from eth_utils import to_checksum_address
+from abi_tables import SELECTORS
+from contracts import ContractRegistry
+from logs import get_logger
+
+log = get_logger(__name__)
+
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+AGGREGATE3_SELECTOR = SELECTORS["aggregate3"]
+
+
+class TokenTable:
+    """Columnar result of a bulk read: one list per column, aligned with owners"""
+
+    def __init__(self, owners, column_names):
+        self.owners = list(owners)
+        self.columns = {name: [None] * len(self.owners) for name in column_names}
+
+    def column(self, name):
+        return self.columns[name]
+
+    def row(self, index):
+        return {name: values[index] for name, values in self.columns.items()}
+
+    def total(self, name):
+        return sum(value for value in self.columns[name] if value is not None)
+
+    def failures(self):
+        return sum(value is None for values in self.columns.values() for value in values)
+
+
+class MulticallReader:
+    """Packs many ERC20 reads into chunked Multicall3 aggregate3 calls"""
+
+    def __init__(self, rpc, chunk_size=300, address=MULTICALL3_ADDRESS):
+        self.rpc = rpc
+        self.chunk_size = chunk_size
+        self.address = to_checksum_address(address)
+
+    async def aggregate3(self, calls, block="latest"):
+        """Run (target, calldata) pairs, returning (success, return_data) per call.
+
+        All chunks go out in one JSON-RPC batch. A chunk whose eth_call fails
+        as a whole reports every sub-call in it as failed.
+        """
+        chunks = [calls[i : i + self.chunk_size] for i in range(0, len(calls), self.chunk_size)]
+        requests = []
+        for chunk in chunks:
+            data = AGGREGATE3_SELECTOR + encode(
+                ["(address,bool,bytes)[]"],
+                [[(target, True, calldata) for target, calldata in chunk]],
+            )
+            requests.append(("eth_call", [{"to": self.address, "data": "0x" + data.hex()}, block]))
+
+        results = []
+        for chunk, response in zip(chunks, await self.rpc.batch(requests)):
+            if "error" in response:
+                log.error(f"Multicall chunk failed: {response['error'].get('message')}")
+                results.extend((False, b"") for _ in chunk)
+                continue
+            (decoded,) = decode(["(bool,bytes)[]"], bytes.fromhex(response["result"][2:]))
+            results.extend(decoded)
+        return results
+
+    async def read_tokens(self, tokens, owners, allowances=None, block="latest"):
+        """Read balanceOf for every (token, owner) pair and optional allowances.
+
+        ``tokens`` maps column name to token address; ``allowances`` maps column
+        name to a (token, spender) pair. Failed sub-calls are left as None.
+        """
+        allowances = allowances or {}
+        owners = [to_checksum_address(owner) for owner in owners]
+        table = TokenTable(owners, list(tokens) + list(allowances))
+
+        calls, slots = [], []
+        for index, owner in enumerate(owners):
+            balance_of = bytes.fromhex(ContractRegistry.balance_of_data(owner)[2:])
+            for name, token in tokens.items():
+                calls.append((token, balance_of))
+                slots.append((name, index))
+            for name, (token, spender) in allowances.items():
+                calls.append((token, bytes.fromhex(ContractRegistry.allowance_data(owner, spender)[2:])))
+                slots.append((name, index))
+
+        for (name, index), (success, data) in zip(slots, await self.aggregate3(calls, block)):
+            if success and len(data) >= 32:
+                table.columns[name][index] = int.from_bytes(data[:32], "big")
+        return table
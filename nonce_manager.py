@@ -0,0 +1,71 @@
+import asyncio
+from collections import defaultdict
+from logs import get_logger
+
+log = get_logger(__name__)
+
+NONCE_ERRORS = (
+    "nonce too low",
+    "invalid nonce",
+    "already known",
+    "known transaction",
+    "replacement transaction underpriced",
+)
+
+
+# The node already holds this exact signed transaction
+KNOWN_TX_ERRORS = ("already known", "known transaction")
+
+
+def is_known_tx_error(error):
+    """Check if a broadcast error means the same transaction was already accepted"""
+    message = str(error).lower()
+    return any(marker in message for marker in KNOWN_TX_ERRORS)
+
+
+def is_nonce_error(error):
+    """Check if a broadcast error means our local nonce is out of sync"""
+    message = str(error).lower()
+    return any(marker in message for marker in NONCE_ERRORS)
+
+
+class NonceManager:
+    """Per-address nonce allocator seeded once from the chain"""
+
+    def __init__(self, rpc):
+        self.rpc = rpc
+        self._next = {}
+        self._locks = defaultdict(asyncio.Lock)
+
+    async def _fetch(self, address):
+        return int(await self.rpc.call("eth_getTransactionCount", [address, "pending"]), 16)
+
+    async def allocate(self, address):
+        """Hand out the next nonce for address without an RPC once seeded"""
+        async with self._locks[address]:
+            if address not in self._next:
+                self._next[address] = await self._fetch(address)
+            nonce = self._next[address]
+            self._next[address] = nonce + 1
+            return nonce
+
+    async def release(self, address, nonce):
+        """Give back a nonce that was allocated but never broadcast"""
+        async with self._locks[address]:
+            if self._next.get(address) == nonce + 1:
+                self._next[address] = nonce
+            else:
+                # A later nonce is already out; resync rather than leave a gap
+                self._next.pop(address, None)
+
+    async def resync(self, address):
+        """Reseed from the chain after a nonce error or a dropped transaction"""
+        async with self._locks[address]:
+            previous = self._next.get(address)
+            self._next[address] = await self._fetch(address)
+            if previous is not None and previous != self._next[address]:
+                log.warning(
+                    f"Nonce resynced for {address}: {previous} -> {self._next[address]}",
+                    address=address,
+                )
+            return self._next[address]
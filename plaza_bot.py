@@ -1,22 +1,52 @@
-import web3
-import requests
 import asyncio
 import random
 import json
 import os
-from datetime import datetime
-from colorama import Fore, Style, init
+import time
 from decimal import Decimal
-from eth_account import Account
-from web3.exceptions import ContractLogicError
 from dotenv import load_dotenv
-from tenacity import retry, stop_after_attempt, wait_exponential
+from eth_utils import from_wei, to_wei
+import abi_tables
+from rpc import DEFAULT_RPC_URL, RpcClient, make_web3
+from rpc_pool import RpcPool
+from cassette import install_cassette
+from snapshot import fetch_wallet_snapshot
+from multicall import MulticallReader
+from contracts import ContractRegistry, decode_uint
+from nonce_manager import NonceManager, is_known_tx_error, is_nonce_error
+from receipt_tracker import ReceiptTracker, to_hash_str
+from gas_oracle import GasOracle
+from gas_cache import GasLimitCache
+from preflight import Preflight, RevertError
+from replacement import ReplacementEngine, StuckTransactionError
+from positions import LogDecoder, PositionLedger
+from indexer import EventIndexer
+from signer import TransactionSigner
+from retry_policy import (
+    CircuitBreaker,
+    RetryableError,
+    RetryPolicy,
+    deadline_scope,
+    time_left,
+)
+from state_store import DONE, FAILED, SIGNED, STATE_DB_FILE, StateStore
+from metrics import METRICS
+from logs import get_logger
 
 # Load environment variables
 load_dotenv()
 
-# Initialize colorama for colored logging
-init(autoreset=True)
+log = get_logger(__name__)
+
+
+class FaucetError(Exception):
+    """A faucet claim that failed; ``retryable`` unless the API refused it outright"""
+
+    def __init__(self, message, retryable=True, retry_after=None):
+        self.retryable = retryable
+        self.retry_after = retry_after
+        super().__init__(message)
+
 
 # Current information
 CURRENT_TIME = "2025-02-14 03:44:55"
@@ -58,17 +88,15 @@ class PlazaFinanceBot:
             "https": self.proxy
         } if self.proxy else None
 
-        # Initialize Web3 and contracts
-        self.w3 = web3.Web3(web3.HTTPProvider("https://sepolia.base.org"))
-        self.WSTETH_ADDRESS = self.w3.to_checksum_address(
-            "0x13e5fb0b6534bb22cbc59fae339dbbe0dc906871"
-        )
-        self.CONTRACT_ADDRESS = self.w3.to_checksum_address(
-            "0x47129e886b44B5b8815e6471FCD7b31515d83242"
-        )
-        self.MIN_GAS_BALANCE = self.w3.to_wei(
-            0.002, "ether"
-        )  # Minimum 0.002 ETH for gas
+        # Everything runs on the shared async RPC client; nothing here touches
+        # the network, and web3 itself is only imported if self.w3 is used
+        self.rpc = RpcClient(pool=RpcPool.from_env(DEFAULT_RPC_URL))
+        install_cassette(self.rpc)
+        self._w3 = None
+        # Checksummed at generation time, see gen_abi_tables.py
+        self.WSTETH_ADDRESS = abi_tables.WSTETH_ADDRESS
+        self.CONTRACT_ADDRESS = abi_tables.CONTRACT_ADDRESS
+        self.MIN_GAS_BALANCE = to_wei(0.002, "ether")  # Minimum 0.002 ETH for gas
         self.PLAZA_API_KEY = os.getenv(
             "PLAZA_API_KEY", "bfc7b70e-66ad-4524-9bb6-733716c4da94"
         )
@@ -77,426 +105,704 @@ class PlazaFinanceBot:
         self.CONTRACT_ABI = self.load_contract_abi()
         self.ERC20_ABI = self.load_erc20_abi()
 
-        # Initialize contracts
-        self.pool_contract = self.w3.eth.contract(
-            address=self.CONTRACT_ADDRESS, abi=self.CONTRACT_ABI
+        # Initialize contracts once; bond/leverage addresses are cached on disk
+        self.contracts = ContractRegistry(
+            self.rpc,
+            self.CONTRACT_ADDRESS,
+            self.WSTETH_ADDRESS,
+            self.CONTRACT_ABI,
+            self.ERC20_ABI,
+            web3_factory=lambda: self.w3,
         )
-        self.wsteth_contract = self.w3.eth.contract(
-            address=self.WSTETH_ADDRESS, abi=self.ERC20_ABI
+        self.multicall = MulticallReader(self.rpc)
+        self.nonces = NonceManager(self.rpc)
+        self.receipts = ReceiptTracker(self.rpc, os.getenv("RPC_WS_URL"))
+        self.gas_oracle = GasOracle(self.rpc)
+        self.receipts.add_block_listener(self.gas_oracle.on_block)
+        self.signer = TransactionSigner.from_env()
+        self.replacements = ReplacementEngine.from_env(
+            self.rpc,
+            self.receipts,
+            self.gas_oracle,
+            on_replace=self._on_replacement,
+            on_forget=self._on_forget,
+            signer=self.signer,
         )
-
-        print(f"{Fore.GREEN}Bot initialized successfully")
-        print(f"{Fore.YELLOW}Current time: {CURRENT_TIME}")
-        print(f"{Fore.YELLOW}User: {CURRENT_USER}")
+        self.gas_limits = GasLimitCache()
+        self.preflight = Preflight(self.rpc, self.CONTRACT_ABI, self.ERC20_ABI)
+        self.ledger = PositionLedger(LogDecoder(self.CONTRACT_ABI, self.ERC20_ABI))
+        self.indexer = None  # built once the bond/leverage addresses are known
+        self.state = StateStore(os.getenv("STATE_DB", STATE_DB_FILE))
+        # Every retry and wait in a wallet shares one time budget
+        self.retry = RetryPolicy.from_env()
+        self.wallet_deadline = float(os.getenv("WALLET_DEADLINE", "900"))
+        self.operation_deadline = float(os.getenv("OPERATION_DEADLINE", "300"))
+        self.faucet_breaker = CircuitBreaker.from_env("faucet")
+        self.cycle_id = None
+
+        log.success(f"Bot initialized successfully")
+        log.info(f"Current time: {CURRENT_TIME}")
+        log.info(f"User: {CURRENT_USER}")
         if self.proxy:
-            print(f"{Fore.YELLOW}Using proxy: {self.proxy}")
+            log.info(f"Using proxy: {self.proxy}")
+
+    @property
+    def w3(self):
+        """AsyncWeb3 over the shared RPC client, built (and web3 imported) on first use"""
+        if self._w3 is None:
+            self._w3 = make_web3(self.rpc)
+            # Chain id is pinned by the gas oracle; skip web3's per-request eth_chainId check
+            self._w3.middleware_onion.remove("validation")
+        return self._w3
+
+    @property
+    def pool_contract(self):
+        return self.contracts.contract(self.CONTRACT_ADDRESS, "pool")
+
+    @property
+    def wsteth_contract(self):
+        return self.contracts.contract(self.WSTETH_ADDRESS)
 
     @staticmethod
     def load_contract_abi():
-        return [
-            {
-                "inputs": [],
-                "name": "bondToken",
-                "outputs": [{"internalType": "address", "name": "", "type": "address"}],
-                "stateMutability": "view",
-                "type": "function",
-            },
-            {
-                "inputs": [],
-                "name": "lToken",
-                "outputs": [{"internalType": "address", "name": "", "type": "address"}],
-                "stateMutability": "view",
-                "type": "function",
-            },
-            {
-                "inputs": [
-                    {
-                        "internalType": "enum Pool.TokenType",
-                        "name": "tokenType",
-                        "type": "uint8",
-                    },
-                    {
-                        "internalType": "uint256",
-                        "name": "depositAmount",
-                        "type": "uint256",
-                    },
-                    {"internalType": "uint256", "name": "minAmount", "type": "uint256"},
-                ],
-                "name": "create",
-                "outputs": [{"internalType": "uint256", "name": "", "type": "uint256"}],
-                "stateMutability": "nonpayable",
-                "type": "function",
-            },
-            {
-                "inputs": [
-                    {
-                        "internalType": "enum Pool.TokenType",
-                        "name": "tokenType",
-                        "type": "uint8",
-                    },
-                    {
-                        "internalType": "uint256",
-                        "name": "depositAmount",
-                        "type": "uint256",
-                    },
-                    {"internalType": "uint256", "name": "minAmount", "type": "uint256"},
-                ],
-                "name": "redeem",
-                "outputs": [{"internalType": "uint256", "name": "", "type": "uint256"}],
-                "stateMutability": "nonpayable",
-                "type": "function",
-            },
-        ]
+        return abi_tables.CONTRACT_ABI
 
     @staticmethod
     def load_erc20_abi():
-        return [
-            {
-                "constant": True,
-                "inputs": [
-                    {"name": "_owner", "type": "address"},
-                    {"name": "_spender", "type": "address"},
-                ],
-                "name": "allowance",
-                "outputs": [{"name": "remaining", "type": "uint256"}],
-                "type": "function",
-            },
-            {
-                "constant": False,
-                "inputs": [
-                    {"name": "_spender", "type": "address"},
-                    {"name": "_value", "type": "uint256"},
-                ],
-                "name": "approve",
-                "outputs": [{"name": "success", "type": "bool"}],
-                "type": "function",
-            },
-            {
-                "constant": True,
-                "inputs": [{"name": "_owner", "type": "address"}],
-                "name": "balanceOf",
-                "outputs": [{"name": "balance", "type": "uint256"}],
-                "type": "function",
-            },
-        ]
+        return abi_tables.ERC20_ABI
 
-    async def check_gas_price(self):
+    async def check_gas_price(self, current_gas_price=None):
         """Check if gas price is reasonable"""
         try:
-            current_gas_price = self.w3.eth.gas_price
-            max_acceptable_gas = self.w3.to_wei(1, "gwei")  # 1 gwei max
-            is_acceptable = current_gas_price <= max_acceptable_gas
+            if current_gas_price is None:
+                current_gas_price = await self.gas_oracle.gas_price()
+            max_acceptable_gas = self.gas_oracle.max_gas_price  # 1 gwei max
+            is_acceptable = await self.gas_oracle.is_acceptable(current_gas_price)
 
-            print(f"{Fore.YELLOW}Current gas price: {self.w3.from_wei(current_gas_price, 'gwei')} gwei")
-            print(f"{Fore.YELLOW}Max acceptable: {self.w3.from_wei(max_acceptable_gas, 'gwei')} gwei")
+            log.info(f"Current gas price: {from_wei(current_gas_price, 'gwei')} gwei")
+            log.info(f"Max acceptable: {from_wei(max_acceptable_gas, 'gwei')} gwei")
 
             return is_acceptable
         except Exception as e:
-            print(f"{Fore.RED}Error checking gas price: {str(e)}")
+            log.error(f"Error checking gas price: {str(e)}")
             return False
 
-    async def wait_for_transaction(self, tx_hash, description):
+    async def wait_for_transaction(self, tx_hash, description, step=None):
         """Wait for transaction confirmation with timeout"""
-        timeout = 300  # 5 minutes timeout
-        start_time = datetime.now()
+        timeout = time_left(300)  # 5 minutes, or what is left of the deadline
 
-        while (datetime.now() - start_time).seconds < timeout:
-            try:
-                receipt = self.w3.eth.get_transaction_receipt(tx_hash)
-                if receipt is not None:
-                    if receipt["status"] == 1:
-                        print(
-                            f"{Fore.GREEN}✓ {description} successful: {tx_hash.hex()}"
-                        )
-                        return True
-                    else:
-                        print(f"{Fore.RED}✗ {description} failed: {tx_hash.hex()}")
-                        return False
-            except Exception as e:
-                print(f"{Fore.YELLOW}Waiting for {description} confirmation...")
-            await asyncio.sleep(5)
+        tx_hash = to_hash_str(tx_hash)
+        log.info(f"Waiting for {description} confirmation...", op=description, tx_hash=tx_hash)
+        started = time.perf_counter()
+        versions = self.replacements.versions(tx_hash)
+        try:
+            receipt = await self.replacements.wait(tx_hash, timeout)
+        except StuckTransactionError as e:
+            log.error(f"Transaction timeout: {description}, {str(e)}", op=description, tx_hash=tx_hash)
+            raise
+        elapsed = round(time.perf_counter() - started, 3)
+        if receipt is None:
+            log.error(f"Transaction timeout: {description}", op=description, tx_hash=tx_hash, elapsed=elapsed)
+            return False
+        if to_hash_str(receipt["transactionHash"]) not in versions:
+            log.error(
+                f"Got the receipt of {receipt['transactionHash']} while waiting for {description}",
+                op=description,
+                tx_hash=tx_hash,
+            )
+            return False
 
-        print(f"{Fore.RED}Transaction timeout: {description}")
+        success = int(receipt["status"], 16) == 1
+        if success:
+            deltas = self.ledger.apply(receipt)
+            if deltas:
+                log.info(
+                    f"{description}: {self.ledger.describe(deltas, {self.WSTETH_ADDRESS: 'wstETH'})}",
+                    op=description,
+                )
+        if step is not None:
+            self.record_step(
+                step,
+                DONE if success else FAILED,
+                tx_hash=receipt["transactionHash"],
+                gas_used=int(receipt["gasUsed"], 16),
+            )
+        fields = {
+            "op": description,
+            "tx_hash": receipt["transactionHash"],
+            "block": int(receipt["blockNumber"], 16),
+            "gas_used": int(receipt["gasUsed"], 16),
+            "elapsed": elapsed,
+        }
+        if success:
+            log.success(f"✓ {description} successful: {receipt['transactionHash']}", **fields)
+            return True
+        log.error(f"✗ {description} failed: {receipt['transactionHash']}", **fields)
         return False
 
+    def begin_cycle(self):
+        """Resume the unfinished cycle from the state store, or start a new one"""
+        self.cycle_id = self.state.current_cycle()
+        return self.cycle_id
+
+    def finish_cycle(self):
+        if self.cycle_id is not None:
+            self.state.finish_cycle(self.cycle_id)
+            self.cycle_id = None
+
+    def record_step(self, step, status, **details):
+        """Record progress for a (wallet address, step name) pair in this cycle"""
+        if self.cycle_id is None:
+            self.begin_cycle()
+        address, name = step
+        self.state.record_step(self.cycle_id, address, name, status, **details)
+
+    def step_status(self, step):
+        if self.cycle_id is None:
+            self.begin_cycle()
+        address, name = step
+        return self.state.step(self.cycle_id, address, name)
+
+    def wallet_completed(self, wallet):
+        status = self.step_status((wallet.address, "wallet"))
+        return status is not None and status[0] == DONE
+
     async def check_token_balance(self, token_address, wallet_address, min_balance):
         """Check if wallet has sufficient token balance"""
         try:
-            token_contract = self.w3.eth.contract(address=token_address, abi=self.ERC20_ABI)
-            balance = token_contract.functions.balanceOf(wallet_address).call()
+            balance = await self.get_token_balance(token_address, wallet_address)
             return balance >= min_balance
         except Exception as e:
-            print(f"{Fore.RED}Error checking token balance: {str(e)}")
+            log.error(f"Error checking token balance: {str(e)}")
             return False
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
     async def claim_faucet(self, address):
-        """Claim faucet with verification and improved headers"""
-        try:
-            if self.proxy:
-                print(f"{Fore.YELLOW}Using proxy: {self.proxy}")
+        """Queue a faucet claim and wait for the tokens; raises FaucetError on failure"""
+        self.faucet_breaker.check()
+        if self.proxy:
+            log.info(f"Using proxy: {self.proxy}")
 
-            session = requests.Session()
-            headers = random.choice(self.headers_pool)
-            headers["x-plaza-api-key"] = self.PLAZA_API_KEY
-            session.headers.update(headers)
+        import requests  # only the faucet needs it
 
-            # Simulate real browser behavior
-            try:
-                await asyncio.sleep(random.uniform(3, 7))
-                session.get(
-                    "https://plaza.finance",
-                    proxies=self.proxies,
-                    timeout=30
-                )
-            except:
-                pass
+        session = requests.Session()
+        headers = random.choice(self.headers_pool)
+        headers["x-plaza-api-key"] = self.PLAZA_API_KEY
+        session.headers.update(headers)
 
-            # Add delay before request
-            await asyncio.sleep(random.uniform(5, 10))
+        # Simulate real browser behavior
+        try:
+            await asyncio.sleep(random.uniform(3, 7))
+            # requests blocks; keep it off the loop other wallets run on
+            await asyncio.to_thread(
+                session.get,
+                "https://plaza.finance",
+                proxies=self.proxies,
+                timeout=30
+            )
+        except Exception:
+            pass
+
+        # Add delay before request
+        await asyncio.sleep(random.uniform(5, 10))
 
-            response = session.post(
+        try:
+            response = await asyncio.to_thread(
+                session.post,
                 "https://api.plaza.finance/faucet/queue",
                 json={"address": address},
                 timeout=30,
                 proxies=self.proxies
             )
-
-            if response.status_code == 403:
-                print(f"{Fore.YELLOW}Cloudflare detected, waiting 60s...")
-                await asyncio.sleep(60)
-                return False
-
-            if response.status_code == 200:
-                print(f"{Fore.GREEN}Faucet claim initiated for {address}")
-                return await self.verify_faucet_claim(address)
-
-            print(f"{Fore.RED}Unexpected status: {response.status_code}")
-            return False
-
         except Exception as error:
-            print(f"{Fore.RED}Error claiming faucet: {str(error)}")
-            await asyncio.sleep(30)
-            return False
+            self.faucet_breaker.record_failure()
+            raise FaucetError(f"faucet request failed: {str(error)}") from error
+
+        if response.status_code == 403:
+            self.faucet_breaker.record_failure()
+            raise FaucetError("Cloudflare challenge", retry_after=60)
+        if response.status_code != 200:
+            overloaded = response.status_code == 429 or response.status_code >= 500
+            if overloaded:
+                self.faucet_breaker.record_failure()
+            raise FaucetError(f"unexpected status {response.status_code}", retryable=overloaded)
+
+        self.faucet_breaker.record_success()
+        log.success(f"Faucet claim initiated for {address}")
+        return await self.verify_faucet_claim(address)
 
     async def verify_faucet_claim(self, address):
         """Verify if faucet tokens were received"""
-        max_attempts = 40
         check_interval = 10
+        # 40 checks, fewer if the wallet's deadline comes first
+        max_attempts = max(1, int(time_left(400) // check_interval))
 
         for i in range(max_attempts):
             try:
                 if await self.check_token_balance(
                     self.WSTETH_ADDRESS,
                     address,
-                    self.w3.to_wei(0.008, "ether")
+                    to_wei(0.008, "ether")
                 ):
-                    print(f"{Fore.GREEN}Faucet tokens received!")
+                    log.success("Faucet tokens received!", op="faucet")
                     return True
 
-                print(f"{Fore.YELLOW}Waiting for tokens... ({i+1}/{max_attempts})")
+                log.info(f"Waiting for tokens... ({i+1}/{max_attempts})", op="faucet", coalesce="faucet-wait")
                 await asyncio.sleep(check_interval)
 
             except Exception as e:
-                print(f"{Fore.YELLOW}Error checking balance: {str(e)}")
+                log.warning(f"Error checking balance: {str(e)}", op="faucet", coalesce="faucet-balance")
                 await asyncio.sleep(5)
 
         return False
 
-    async def process_wallet(self, private_key, wallet_index, total_wallets):
-        """Process a single wallet with comprehensive error handling"""
-        max_retries = 3
-        for attempt in range(max_retries):
+    async def process_wallet(self, wallet, wallet_index, total_wallets):
+        """Process a single wallet within WALLET_DEADLINE, retrying retryable failures"""
+        log.info(
+            f"=== Processing Wallet {wallet_index}/{total_wallets}: {wallet.address} ==="
+        )
+        if self.wallet_completed(wallet):
+            log.success("Wallet already completed this cycle")
+            return True
+
+        with deadline_scope(self.wallet_deadline):
             try:
-                account = self.w3.eth.account.from_key(private_key)
-                wallet_address = account.address
+                return await self.retry.run(lambda: self._process_wallet_once(wallet), "process_wallet")
+            except Exception as e:
+                log.error(f"Wallet {wallet_index} failed: {str(e)}")
+                return False
 
-                print(
-                    f"\n{Fore.YELLOW}=== Processing Wallet {wallet_index}/{total_wallets}: {wallet_address} ==="
-                )
+    async def _process_wallet_once(self, wallet):
+        """One pass over the wallet's steps; steps already DONE are skipped"""
+        wallet_address = wallet.address
 
-                # Check ETH balance
-                eth_balance = self.w3.eth.get_balance(wallet_address)
-                if eth_balance < self.MIN_GAS_BALANCE:
-                    print(
-                        f"{Fore.RED}Insufficient ETH for gas. Need {self.w3.from_wei(self.MIN_GAS_BALANCE, 'ether')} ETH"
-                    )
-                    return False
+        # Read balances and allowance in one consistent snapshot; from
+        # here on receipts keep the wallet's token position current
+        snapshot = await self.fetch_snapshot(wallet_address)
+        position = self.ledger.seed(snapshot)
+        self.ledger.track_token(wallet_address, self.WSTETH_ADDRESS, snapshot.wsteth_balance)
 
-                # Check gas price
-                if not await self.check_gas_price():
-                    print(f"{Fore.RED}Gas price too high, skipping wallet")
-                    return False
+        # Check ETH balance
+        if snapshot.eth_balance < self.MIN_GAS_BALANCE:
+            log.error(
+                f"Insufficient ETH for gas. Need {from_wei(self.MIN_GAS_BALANCE, 'ether')} ETH"
+            )
+            return False
+
+        # Check gas price
+        if not await self.check_gas_price():
+            log.error(f"Gas price too high, skipping wallet")
+            return False
+
+        # Claim faucet and verify (once per cycle)
+        faucet_step = (wallet_address, "faucet")
+        faucet_status = self.step_status(faucet_step)
+        if faucet_status is None or faucet_status[0] != DONE:
 
-                # Claim faucet and verify
+            async def claim():
                 if not await self.claim_faucet(wallet_address):
-                    if attempt < max_retries - 1:
-                        wait_time = random.uniform(60, 180)
-                        print(f"{Fore.YELLOW}Retrying in {int(wait_time)}s...")
-                        await asyncio.sleep(wait_time)
-                        continue
-                    return False
+                    raise FaucetError("faucet tokens not received")
 
-                # Set unlimited approval
-                try:
-                    allowance = self.wsteth_contract.functions.allowance(
-                        wallet_address, self.CONTRACT_ADDRESS
-                    ).call()
-                    if allowance < self.w3.to_wei(1, "ether"):
-                        approve_tx = await self.approve_token(private_key)
-                        if not approve_tx:
-                            print(f"{Fore.RED}Approval failed, skipping wallet")
-                            return False
-                except Exception as e:
-                    print(f"{Fore.RED}Error checking/setting approval: {str(e)}")
-                    return False
+            try:
+                await self.retry.run(claim, "claim_faucet")
+            except Exception as e:
+                # The claim had its own retries; retrying the wallet would claim again
+                raise FaucetError(f"faucet claim gave up: {str(e)}", retryable=False) from e
+            self.record_step(faucet_step, DONE)
 
-                # Perform operations
-                operations = [
-                    ("create", 0),  # Create Bond
-                    ("create", 1),  # Create Leverage
-                    ("redeem", 0),  # Redeem Bond
-                    ("redeem", 1),  # Redeem Leverage
-                ]
-
-                for operation, token_type in operations:
-                    success = await self.perform_operation(
-                        operation, token_type, private_key
-                    )
-                    if not success:
-                        print(
-                            f"{Fore.RED}{operation.capitalize()} operation failed for token type {token_type}"
-                        )
-                        continue
-                    await asyncio.sleep(random.uniform(10, 20))
+        # Set unlimited approval
+        try:
+            if snapshot.allowance < to_wei(1, "ether"):
+                approve_tx = await self.approve_token(wallet)
+                if not approve_tx:
+                    log.error(f"Approval failed, skipping wallet")
+                    return False
+        except Exception as e:
+            log.error(f"Error checking/setting approval: {str(e)}")
+            return False
 
-                return True
+        # Pipeline creates, then redeems: each phase is signed and
+        # broadcast back-to-back and confirmed together
+        created = await self.perform_operations(
+            [("create", 0), ("create", 1)], wallet, position
+        )
 
-            except Exception as e:
-                print(f"{Fore.RED}Error on attempt {attempt + 1}/3: {str(e)}")
-                if attempt < max_retries - 1:
-                    await asyncio.sleep(random.uniform(30, 60))
+        # Redeem amounts come from the minted amounts in the create receipts
+        redeemed = await self.perform_operations(
+            [("redeem", 0), ("redeem", 1)], wallet, position
+        )
 
-        return False
+        self.ledger.forget(wallet_address)
+        if not (created and redeemed):
+            # Left open so a restart in this cycle tries the failed steps again
+            return False
+        self.record_step((wallet_address, "wallet"), DONE)
+        return True
 
-    async def approve_token(self, private_key):
+    async def approve_token(self, wallet):
         """Approve token spending"""
-        account = self.w3.eth.account.from_key(private_key)
         max_uint = 2**256 - 1
 
         try:
-            approve_txn = self.wsteth_contract.functions.approve(
-                self.CONTRACT_ADDRESS, max_uint
+            approve_txn = self.contracts.approve(
+                self.WSTETH_ADDRESS, self.CONTRACT_ADDRESS, max_uint
             )
-            signed_txn = await self.build_and_sign_tx(
-                approve_txn, account.address, private_key
-            )
-            tx_hash = self.w3.eth.send_raw_transaction(signed_txn.rawTransaction)
-            return await self.wait_for_transaction(tx_hash, "Token approval")
+            step = (wallet.address, "approve")
+            signed_txn = await self.build_and_sign_tx(approve_txn, wallet, step)
+            tx_hash = await self.broadcast(signed_txn, wallet.address)
+            if await self.wait_for_transaction(tx_hash, "Token approval", step):
+                return True
+            await self.nonces.resync(wallet.address)
+            return False
         except Exception as e:
-            print(f"{Fore.RED}Approval error: {str(e)}")
+            log.error(f"Approval error: {str(e)}")
             return False
 
-    async def build_and_sign_tx(self, transaction, from_address, private_key):
-        """Build and sign transaction with current gas price"""
+    async def build_tx(self, call, wallet, step=None):
+        """Build an EIP-1559 transaction with cached fees and a local nonce"""
+        from_address = wallet.address
+        gas_key = self.gas_limits.key_for(call)
+        gas_limit = self.gas_limits.limit_for(gas_key)
+        build_started = time.perf_counter()
         try:
-            gas_estimate = await transaction.estimate_gas({"from": from_address})
-            gas_price = self.w3.eth.gas_price
-            chain_id = self.w3.eth.chain_id
-
-            transaction_data = transaction.build_transaction(
-                {
-                    "from": from_address,
-                    "gas": int(gas_estimate * 1.2),  # Add 20% buffer
-                    "gasPrice": gas_price,
-                    "nonce": self.w3.eth.get_transaction_count(from_address),
-                    "chainId": chain_id,
-                }
+            # Simulate against the pending block alongside the fee lookups;
+            # the simulation doubles as the gas estimate on a cold cache
+            fee_params, chain_id, gas_estimate = await asyncio.gather(
+                self.gas_oracle.fee_params(),
+                self.gas_oracle.chain_id(),
+                self.preflight.check(call, from_address, estimate=gas_limit is None),
             )
+            if gas_limit is None:
+                # Cold cache or recent out-of-gas: pad the estimate by 20%
+                gas_limit = int(gas_estimate * 1.2)
+        except RevertError as e:
+            log.error(f"Preflight: {call.name} {str(e)}", op=call.name, revert=e.kind)
+            if step is not None and not e.retryable:
+                self.record_step(step, FAILED)
+            raise
+        except Exception as e:
+            log.error(f"Error building transaction: {str(e)}")
+            raise
 
-            return self.w3.eth.account.sign_transaction(transaction_data, private_key)
+        nonce = await self.nonces.allocate(from_address)
+        METRICS.observe(
+            "plaza_tx_phase_seconds", time.perf_counter() - build_started, phase="build"
+        )
+        transaction_data = {
+            "type": 2,
+            "to": call.to,
+            "data": call.data,
+            "value": 0,
+            "gas": gas_limit,
+            **fee_params,
+            "nonce": nonce,
+            "chainId": chain_id,
+        }
+        return transaction_data, gas_key, step
+
+    async def sign_built(self, built, wallet):
+        """Sign a wallet's built transactions in one batch and record them as SIGNED"""
+        try:
+            with METRICS.timer("plaza_tx_phase_seconds", phase="sign"):
+                signed = await self.signer.sign_batch(
+                    [(wallet, transaction_data) for transaction_data, _, _ in built]
+                )
         except Exception as e:
-            print(f"{Fore.RED}Error building transaction: {str(e)}")
+            # Newest first, so each release can rewind the local nonce
+            for transaction_data, _, _ in reversed(built):
+                await self.nonces.release(wallet.address, transaction_data["nonce"])
+            log.error(f"Error signing transactions: {str(e)}")
+            raise
+        for (transaction_data, gas_key, step), signed_tx in zip(built, signed):
+            tx_hash = to_hash_str(signed_tx.hash)
+            self.gas_limits.track(tx_hash, gas_key, transaction_data["gas"])
+            self.replacements.track(signed_tx, transaction_data, wallet, step)
+            if step is not None:
+                self.record_step(step, SIGNED, tx_hash=tx_hash, nonce=transaction_data["nonce"])
+        return signed
+
+    async def build_and_sign_tx(self, call, wallet, step=None):
+        """Build and sign a single transaction"""
+        (signed_tx,) = await self.sign_built([await self.build_tx(call, wallet, step)], wallet)
+        return signed_tx
+
+    async def broadcast(self, signed_tx, from_address):
+        """Send a signed transaction, resyncing the nonce on nonce errors"""
+        try:
+            with METRICS.timer("plaza_tx_phase_seconds", phase="broadcast"):
+                tx_hash = await self.rpc.call(
+                    "eth_sendRawTransaction", ["0x" + bytes(signed_tx.rawTransaction).hex()]
+                )
+            METRICS.tx_broadcast(to_hash_str(tx_hash))
+            return tx_hash
+        except Exception as e:
+            if is_known_tx_error(e):
+                # A resend (e.g. after a timed-out post) of a tx the node already has
+                tx_hash = to_hash_str(signed_tx.hash)
+                METRICS.tx_broadcast(tx_hash)
+                return tx_hash
+            self.replacements.discard(signed_tx.hash)
+            if is_nonce_error(e):
+                await self.nonces.resync(from_address)
             raise
 
-    async def perform_operation(self, operation, token_type, private_key):
-        """Perform create or redeem operation with retries"""
-        account = self.w3.eth.account.from_key(private_key)
-        max_retries = 3
+    def _on_replacement(self, op, replacement_hash):
+        """Keep gas learning and the resume record on the newest version of a tx"""
+        self.gas_limits.track_replacement(op.hashes[-2], replacement_hash)
+        if op.step is not None:
+            self.record_step(op.step, SIGNED, tx_hash=replacement_hash)
+
+    def _on_forget(self, op):
+        """Learn from the mined version, if any, and drop the per-hash state of every version"""
+        if op.future.done() and not op.future.cancelled():
+            self.gas_limits.observe(op.future.result())
+        self.gas_limits.forget(op.hashes)
+        METRICS.tx_forget(op.hashes)
+
+    async def prepare_operation(self, operation, token_type, wallet, position=None):
+        """The create or redeem call to send; None if there is nothing to do"""
+        step = (wallet.address, f"{operation}:{token_type}")
+
+        if operation == "create":
+            amount = to_wei(random.uniform(0.009, 0.01), "ether")
+            transaction = self.contracts.create(token_type, amount, 0)
+            log.info(
+                f"Creating with amount: {from_wei(amount, 'ether')} ETH",
+                op=f"create {token_type}",
+                amount=amount,
+            )
+        else:  # redeem
+            if position is not None:
+                balance = position.token_balance(token_type)
+            else:
+                token_address = await self.get_token_address(token_type)
+                balance = await self.get_token_balance(token_address, wallet.address)
+            if balance == 0:
+                log.info(f"No balance to redeem for token type {token_type}", op=f"redeem {token_type}")
+                self.record_step(step, DONE)
+                return None
+            amount = balance // 2
+            transaction = self.contracts.redeem(token_type, amount, 0)
+            log.info(
+                f"Redeeming amount: {from_wei(amount, 'ether')} tokens",
+                op=f"redeem {token_type}",
+                amount=amount,
+            )
+        return transaction
+
+    async def submit_operation(self, operation, token_type, wallet, position=None):
+        """Build, sign and broadcast a create or redeem; None if there is nothing to do"""
+        transaction = await self.prepare_operation(operation, token_type, wallet, position)
+        if transaction is None:
+            return None
+        step = (wallet.address, f"{operation}:{token_type}")
+        signed_tx = await self.build_and_sign_tx(transaction, wallet, step)
+        return await self.broadcast(signed_tx, wallet.address)
+
+    async def _was_broadcast(self, tx_hash):
+        """Check if a recorded transaction reached the node (mempool or chain)"""
+        receipt, transaction = await self.rpc.batch(
+            [
+                ("eth_getTransactionReceipt", [tx_hash]),
+                ("eth_getTransactionByHash", [tx_hash]),
+            ]
+        )
+        return bool(receipt.get("result") or transaction.get("result"))
 
-        for attempt in range(max_retries):
-            try:
-                print(
-                    f"{Fore.YELLOW}Attempting {operation} for token type {token_type} (attempt {attempt + 1}/{max_retries})"
-                )
+    async def perform_operations(self, operations, wallet, position=None):
+        """Build operations, sign them as one batch, broadcast back-to-back, confirm together.
 
-                if operation == "create":
-                    amount = self.w3.to_wei(random.uniform(0.009, 0.01), "ether")
-                    transaction = self.pool_contract.functions.create(
-                        token_type, amount, 0
-                    )
-                    print(
-                        f"{Fore.YELLOW}Creating with amount: {self.w3.from_wei(amount, 'ether')} ETH"
-                    )
-                else:  # redeem
-                    token_address = await self.get_token_address(token_type)
-                    balance = await self.get_token_balance(
-                        token_address, account.address
-                    )
-                    if balance == 0:
-                        print(
-                            f"{Fore.YELLOW}No balance to redeem for token type {token_type}"
-                        )
-                        return True
-                    amount = balance // 2
-                    transaction = self.pool_contract.functions.redeem(
-                        token_type, amount, 0
-                    )
-                    print(
-                        f"{Fore.YELLOW}Redeeming amount: {self.w3.from_wei(amount, 'ether')} tokens"
+        Failed operations are retried one by one, unless a timed-out one is
+        still queued at its nonce: then StuckTransactionError is raised.
+        """
+
+        submitted = []
+        built = []  # (index into submitted, built transaction)
+        for operation, token_type in operations:
+            step = (wallet.address, f"{operation}:{token_type}")
+            try:
+                status = self.step_status(step)
+                if status is not None and status[0] == DONE:
+                    tx_hash = None
+                elif (
+                    status is not None
+                    and status[0] == SIGNED
+                    and await self._was_broadcast(status[1])
+                ):
+                    # Resume waiting on a transaction sent before a restart
+                    tx_hash = status[1]
+                else:
+                    transaction = await self.prepare_operation(
+                        operation, token_type, wallet, position
                     )
+                    tx_hash = None
+                    if transaction is not None:
+                        built.append((len(submitted), await self.build_tx(transaction, wallet, step)))
+            except Exception as e:
+                log.error(f"{operation.capitalize()} submit failed: {str(e)}")
+                tx_hash = e
+            submitted.append([operation, token_type, tx_hash])
 
-                signed_tx = await self.build_and_sign_tx(
-                    transaction, account.address, private_key
-                )
-                tx_hash = self.w3.eth.send_raw_transaction(signed_tx.rawTransaction)
-                success = await self.wait_for_transaction(
-                    tx_hash, f"{operation} {token_type}"
+        if built:
+            try:
+                signed = await self.sign_built([item for _, item in built], wallet)
+            except Exception as e:
+                for index, _ in built:
+                    submitted[index][2] = e
+            else:
+                failed = None
+                for (index, (_, _, step)), signed_tx in zip(built, signed):
+                    operation = submitted[index][0]
+                    if failed is not None:
+                        # Its nonce sits behind one the node never got: sending it
+                        # would only park it in the mempool. Rebuild it in order.
+                        self.replacements.discard(signed_tx.hash)
+                        self.record_step(step, FAILED)
+                        submitted[index][2] = failed
+                        continue
+                    try:
+                        submitted[index][2] = await self.broadcast(signed_tx, wallet.address)
+                    except Exception as e:
+                        log.error(f"{operation.capitalize()} submit failed: {str(e)}")
+                        submitted[index][2] = e
+                        failed = e
+                if failed is not None:
+                    # Hand the failed nonce and everything after it out again
+                    await self.nonces.resync(wallet.address)
+
+        async def confirm(item):
+            operation, token_type, tx_hash = item
+            if tx_hash is None:
+                return True
+            if isinstance(tx_hash, Exception):
+                return False
+            try:
+                return await self.wait_for_transaction(
+                    tx_hash,
+                    f"{operation} {token_type}",
+                    (wallet.address, f"{operation}:{token_type}"),
                 )
+            except StuckTransactionError as e:
+                item[2] = e
+                return False
 
-                if success:
-                    return True
+        results = await asyncio.gather(*(confirm(item) for item in submitted))
+        if not all(results):
+            await self.nonces.resync(wallet.address)
 
-            except Exception as e:
-                print(
-                    f"{Fore.RED}{operation.capitalize()} attempt {attempt + 1} failed: {str(e)}"
+        # Anything sent now would queue behind a nonce that is still unmined
+        stuck = next(
+            (outcome for _, _, outcome in submitted if isinstance(outcome, StuckTransactionError)),
+            None,
+        )
+        succeeded = True
+        for (operation, token_type, outcome), success in zip(submitted, results):
+            # A revert that can't clear on its own would only burn gas and minutes
+            fatal = isinstance(outcome, RevertError) and not outcome.retryable
+            if not success and not fatal and stuck is None:
+                METRICS.inc("plaza_retries_total", site="perform_operations")
+                success = await self.perform_operation(
+                    operation, token_type, wallet, position
                 )
-                if attempt < max_retries - 1:
-                    wait_time = random.uniform(10, 20)
-                    print(
-                        f"{Fore.YELLOW}Waiting {int(wait_time)}s before next attempt..."
-                    )
-                    await asyncio.sleep(wait_time)
+            if not success:
+                log.error(
+                    f"{operation.capitalize()} operation failed for token type {token_type}"
+                )
+                succeeded = False
+        if stuck is not None:
+            raise stuck
+        return succeeded
+
+    async def perform_operation(self, operation, token_type, wallet, position=None):
+        """Retry a create or redeem within OPERATION_DEADLINE"""
+        description = f"{operation} {token_type}"
+
+        async def attempt():
+            log.info(f"Attempting {operation} for token type {token_type}")
+            tx_hash = await self.submit_operation(
+                operation, token_type, wallet, position
+            )
+            if tx_hash is None:
+                return True
+            if await self.wait_for_transaction(
+                tx_hash,
+                description,
+                (wallet.address, f"{operation}:{token_type}"),
+            ):
+                return True
+            await self.nonces.resync(wallet.address)
+            raise RetryableError(f"{description} not confirmed")
 
-        return False
+        with deadline_scope(self.operation_deadline):
+            try:
+                return await self.retry.run(attempt, "perform_operation")
+            except Exception as e:
+                log.error(f"{operation.capitalize()} failed: {str(e)}")
+                return False
 
     async def get_token_address(self, token_type):
         """Get token contract address based on type"""
         try:
-            if token_type == 0:
-                return self.pool_contract.functions.bondToken().call()
-            return self.pool_contract.functions.lToken().call()
+            return await self.contracts.token_address(token_type)
         except Exception as e:
-            print(f"{Fore.RED}Error getting token address: {str(e)}")
+            log.error(f"Error getting token address: {str(e)}")
             raise
 
     async def get_token_balance(self, token_address, wallet_address):
         """Get token balance"""
         try:
-            token_contract = self.w3.eth.contract(
-                address=token_address, abi=self.ERC20_ABI
+            result = await self.rpc.call(
+                "eth_call",
+                [
+                    {
+                        "to": token_address,
+                        "data": self.contracts.balance_of_data(wallet_address),
+                    },
+                    "latest",
+                ],
             )
-            return token_contract.functions.balanceOf(wallet_address).call()
+            return decode_uint(result)
         except Exception as e:
-            print(f"{Fore.RED}Error getting token balance: {str(e)}")
+            log.error(f"Error getting token balance: {str(e)}")
             raise
+
+    async def fetch_snapshot(self, wallet_address):
+        """Fetch the wallet's state pinned to a single block"""
+        return await fetch_wallet_snapshot(
+            self.rpc, self.contracts, wallet_address, self.receipts.block_number
+        )
+
+    async def survey_wallets(self, addresses):
+        """Read wstETH/bond/leverage balances and pool allowance for many wallets"""
+        token_addresses = await self.contracts.token_addresses()
+
+        return await self.multicall.read_tokens(
+            {
+                "wsteth": self.WSTETH_ADDRESS,
+                "bond": token_addresses[0],
+                "leverage": token_addresses[1],
+            },
+            addresses,
+            allowances={"allowance": (self.WSTETH_ADDRESS, self.CONTRACT_ADDRESS)},
+        )
+
+    async def index_positions(self, addresses):
+        """Sync the event index, then read every wallet's positions from it"""
+        if self.indexer is None:
+            token_addresses = await self.contracts.token_addresses()
+            self.indexer = EventIndexer.from_env(
+                self.rpc,
+                self.state,
+                [self.WSTETH_ADDRESS, token_addresses[0], token_addresses[1]],
+                self.CONTRACT_ADDRESS,
+                self.CONTRACT_ABI,
+                self.multicall,
+            )
+        head = await self.indexer.sync(addresses)
+        return head, self.indexer.positions(addresses)
+
+    async def close(self):
+        """Release the pooled RPC connections and the state store"""
+        await self.receipts.stop()
+        self.signer.close()
+        self.state.close()
+        await self.rpc.close()
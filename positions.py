@@ -0,0 +1,127 @@
+from eth_abi import decode
+from eth_utils import event_abi_to_log_topic, to_checksum_address
+from abi_tables import TRANSFER_EVENT, TRANSFER_TOPIC
+
+
+class LogDecoder:
+    """Decodes receipt logs for the ERC20 Transfer event and any ABI events"""
+
+    def __init__(self, *abis):
+        self.events = {TRANSFER_TOPIC: TRANSFER_EVENT}
+        for event in [item for abi in abis for item in abi]:
+            if event.get("type") == "event" and not event.get("anonymous"):
+                self.events["0x" + event_abi_to_log_topic(event).hex()] = event
+
+    def decode(self, log):
+        """Return (event name, emitting address, args) or None for unknown logs"""
+        topics = [topic if isinstance(topic, str) else "0x" + bytes(topic).hex() for topic in log["topics"]]
+        event = self.events.get(topics[0].lower()) if topics else None
+        if event is None:
+            return None
+        indexed = [arg for arg in event["inputs"] if arg["indexed"]]
+        if len(indexed) != len(topics) - 1:
+            # Same signature, different indexing (ERC721 Transfer)
+            return None
+        args = {}
+        for arg, topic in zip(indexed, topics[1:]):
+            (args[arg["name"]],) = decode([arg["type"]], bytes.fromhex(topic[2:]))
+        data = log["data"] if isinstance(log["data"], str) else "0x" + bytes(log["data"]).hex()
+        unindexed = [arg for arg in event["inputs"] if not arg["indexed"]]
+        values = decode([arg["type"] for arg in unindexed], bytes.fromhex(data[2:]))
+        args.update(zip((arg["name"] for arg in unindexed), values))
+        return event["name"], to_checksum_address(log["address"]), args
+
+    def transfers(self, receipt):
+        """Yield (token, sender, recipient, amount) for every ERC20 Transfer in a receipt"""
+        for log in receipt.get("logs", []):
+            decoded = self.decode(log)
+            if decoded is not None and decoded[0] == "Transfer":
+                _, token, args = decoded
+                yield token, to_checksum_address(args["from"]), to_checksum_address(args["to"]), args["value"]
+
+
+class Position:
+    """A wallet's token balances: a snapshot plus every receipt applied since"""
+
+    __slots__ = ("address", "block_number", "balances", "token_types", "applied")
+
+    def __init__(self, address, block_number, balances, token_types):
+        self.address = address
+        self.block_number = block_number
+        self.balances = balances  # token address -> amount
+        self.token_types = token_types  # 0/1 -> bond/leverage token address
+        self.applied = set()
+
+    def token_balance(self, token_type):
+        return self.balances.get(self.token_types[token_type], 0)
+
+
+class PositionLedger:
+    """Per-wallet positions kept current from confirmed receipts.
+
+    Seeded from a WalletSnapshot, then each receipt's Transfer logs move the
+    tracked tokens (wstETH, bond, leverage), so redeem amounts need no balance
+    reads. Receipts at or before the seeding block are already counted and
+    skipped. Transfers we never see a receipt for, such as faucet drips, are
+    not reflected until the next seed.
+    """
+
+    def __init__(self, decoder):
+        self.decoder = decoder
+        self.positions = {}
+
+    def seed(self, snapshot):
+        tokens = {0: snapshot.bond_token, 1: snapshot.leverage_token}
+        position = Position(
+            snapshot.address,
+            snapshot.block_number,
+            {
+                snapshot.bond_token: snapshot.bond_balance,
+                snapshot.leverage_token: snapshot.leverage_balance,
+            },
+            tokens,
+        )
+        self.positions[snapshot.address] = position
+        return position
+
+    def track_token(self, address, token, balance):
+        """Follow another token (e.g. wstETH) from a known balance"""
+        position = self.positions.get(address)
+        if position is not None:
+            position.balances[token] = balance
+
+    def position(self, address):
+        return self.positions.get(address)
+
+    def apply(self, receipt):
+        """Apply a receipt's transfers; returns {(token, address): delta} for tracked wallets"""
+        tx_hash = receipt["transactionHash"]
+        block_number = int(receipt["blockNumber"], 16)
+        deltas = {}
+        for token, sender, recipient, amount in self.decoder.transfers(receipt):
+            for owner, delta in ((sender, -amount), (recipient, amount)):
+                position = self.positions.get(owner)
+                if (
+                    position is None
+                    or token not in position.balances
+                    or block_number <= position.block_number
+                    or tx_hash in position.applied
+                ):
+                    continue
+                position.balances[token] += delta
+                deltas[(token, owner)] = deltas.get((token, owner), 0) + delta
+        for _, owner in deltas:
+            self.positions[owner].applied.add(tx_hash)
+        return deltas
+
+    def forget(self, address):
+        self.positions.pop(address, None)
+
+    def describe(self, deltas, names=None):
+        """Signed per-token summary of a receipt's deltas, e.g. +0.300000 bond"""
+        parts = []
+        for (token, owner), delta in deltas.items():
+            token_types = self.positions[owner].token_types
+            name = {token_types[0]: "bond", token_types[1]: "leverage"}.get(token)
+            parts.append(f"{delta / 10**18:+.6f} {name or (names or {}).get(token, token)}")
+        return ", ".join(parts)
@@ -0,0 +1,109 @@
+from eth_abi import decode
+from eth_utils import function_signature_to_4byte_selector
+from metrics import METRICS
+from rpc import RpcError
+
+ERROR_SELECTOR = "0x08c379a0"  # Error(string)
+PANIC_SELECTOR = "0x4e487b71"  # Panic(uint256)
+
+PANIC_REASONS = {
+    0x01: "assertion failed",
+    0x11: "arithmetic overflow or underflow",
+    0x12: "division or modulo by zero",
+    0x21: "invalid enum value",
+    0x22: "corrupt storage byte array",
+    0x31: "pop on empty array",
+    0x32: "array index out of bounds",
+    0x41: "out of memory",
+    0x51: "call to an uninitialized function",
+}
+
+# Revert reasons that can clear on their own: an approval still propagating
+# to the node we asked, or a price/deadline that moves between blocks
+RETRYABLE_REASONS = ("insufficient allowance", "slippage", "deadline", "expired", "stale")
+
+
+class RevertError(Exception):
+    """A transaction that would revert, with its decoded and classified reason"""
+
+    def __init__(self, kind, reason, retryable, data=None):
+        self.kind = kind  # "error", "panic", "custom" or "unknown"
+        self.reason = reason
+        self.retryable = retryable
+        self.data = data
+        super().__init__(f"would revert ({kind}): {reason}")
+
+
+def custom_errors(*abis):
+    """Map 4-byte selectors to (signature, input types) for ABI ``error`` entries"""
+    errors = {}
+    for abi in abis:
+        for item in abi:
+            if item.get("type") != "error":
+                continue
+            types = [arg["type"] for arg in item.get("inputs", [])]
+            signature = f"{item['name']}({','.join(types)})"
+            selector = "0x" + function_signature_to_4byte_selector(signature).hex()
+            errors[selector] = (signature, types)
+    return errors
+
+
+def decode_revert(data, errors=None):
+    """Decode revert data into a RevertError"""
+    data = (data or "0x").lower()
+    selector, payload = data[:10], bytes.fromhex(data[10:])
+    try:
+        if selector == ERROR_SELECTOR:
+            (reason,) = decode(["string"], payload)
+            retryable = any(text in reason.lower() for text in RETRYABLE_REASONS)
+            return RevertError("error", reason, retryable, data)
+        if selector == PANIC_SELECTOR:
+            (code,) = decode(["uint256"], payload)
+            return RevertError("panic", PANIC_REASONS.get(code, f"panic 0x{code:02x}"), False, data)
+        if errors and selector in errors:
+            signature, types = errors[selector]
+            args = decode(types, payload) if types else ()
+            reason = f"{signature.split('(')[0]}({', '.join(str(arg) for arg in args)})"
+            return RevertError("custom", reason, False, data)
+    except Exception:
+        pass
+    # A bare revert says nothing about why; it may be a lagging node
+    return RevertError("unknown", data if len(data) > 2 else "no revert data", True, data)
+
+
+def revert_data(error):
+    """Pull the hex revert payload out of a JSON-RPC error, if it carries one"""
+    data = error.data
+    if isinstance(data, dict):
+        data = data.get("data")
+    if isinstance(data, str) and data.startswith("0x"):
+        return data
+    return None
+
+
+class Preflight:
+    """Simulates a call against the pending block before it is signed.
+
+    Runs eth_estimateGas when a gas estimate is needed anyway, otherwise
+    eth_call, so a cold gas cache costs no extra round trip.
+    """
+
+    def __init__(self, rpc, *abis, block="pending"):
+        self.rpc = rpc
+        self.block = block
+        self.errors = custom_errors(*abis)
+
+    async def check(self, call, from_address, estimate=False):
+        """Return the gas estimate (or None), raising RevertError if it would revert"""
+        tx = {"from": from_address, "to": call.to, "data": call.data}
+        method = "eth_estimateGas" if estimate else "eth_call"
+        try:
+            result = await self.rpc.call(method, [tx, self.block])
+        except RpcError as e:
+            data = revert_data(e)
+            if data is None and "revert" not in str(e).lower():
+                raise
+            error = decode_revert(data, self.errors)
+            METRICS.inc("plaza_preflight_reverts_total", kind=error.kind, operation=call.name)
+            raise error from e
+        return int(result, 16) if estimate else None
@@ -0,0 +1,119 @@
+import asyncio
+import os
+import time
+import aiohttp
+
+# JSON-RPC error codes providers use for "slow down"
+THROTTLE_CODES = (-32005, -32029, 429)
+
+
+class RateLimitedError(Exception):
+    """The endpoint answered with a JSON-RPC rate-limit error"""
+
+
+def is_throttle_error(error):
+    """Check if a transport error means the endpoint wants less traffic"""
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status in (429, 503)
+    return isinstance(error, (asyncio.TimeoutError, RateLimitedError))
+
+
+def retry_after(error):
+    """Seconds from a Retry-After header, if the endpoint sent one"""
+    headers = getattr(error, "headers", None) or {}
+    try:
+        return float(headers.get("Retry-After", 0))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def throttled_response(response):
+    """Return the first rate-limit error in a JSON-RPC response, if any"""
+    for item in response if isinstance(response, list) else [response]:
+        error = item.get("error") if isinstance(item, dict) else None
+        if error and (
+            error.get("code") in THROTTLE_CODES
+            or "rate limit" in str(error.get("message", "")).lower()
+        ):
+            return error
+    return None
+
+
+class AdaptiveLimiter:
+    """Token bucket plus AIMD concurrency window for one endpoint.
+
+    Every request takes one token per JSON-RPC call and a concurrency slot.
+    Successes grow the window by about one slot per window's worth of
+    requests and creep the rate back up; a 429, rate-limit error or timeout
+    halves both (at most once per ``cooldown`` seconds).
+    """
+
+    def __init__(self, rate=20.0, burst=None, max_concurrency=16, min_rate=0.5, cooldown=1.0):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min_rate
+        self.burst = burst or max(1.0, rate)
+        self.tokens = self.burst
+        self.max_concurrency = max_concurrency
+        self.limit = float(max_concurrency)
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self._updated = time.monotonic()
+        self._last_decrease = 0.0
+        self._slots = asyncio.Condition()
+
+    @classmethod
+    def from_env(cls):
+        rate = float(os.getenv("RPC_RATE", "20"))
+        burst = os.getenv("RPC_BURST")
+        return cls(
+            rate=rate,
+            burst=float(burst) if burst else None,
+            max_concurrency=int(os.getenv("RPC_MAX_CONCURRENCY", "16")),
+        )
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, cost=1):
+        """Wait for a concurrency slot and ``cost`` tokens"""
+        async with self._slots:
+            await self._slots.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        cost = min(cost, self.burst)
+        try:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= cost:
+                    self.tokens -= cost
+                    return
+                await asyncio.sleep((cost - self.tokens) / self.rate)
+        except BaseException:
+            await self.release(adapt=False)
+            raise
+
+    async def release(self, throttled=False, pause=0.0, adapt=True):
+        """Free the slot and adapt: additive increase, multiplicative decrease"""
+        now = time.monotonic()
+        if adapt and throttled:
+            # Without a Retry-After hint, back off for one cooldown
+            self.paused_until = max(self.paused_until, now + (pause or self.cooldown))
+            if now - self._last_decrease >= self.cooldown:
+                self._last_decrease = now
+                self.limit = max(1.0, self.limit / 2)
+                self.rate = max(self.min_rate, self.rate / 2)
+                self._refill(now)
+                self.tokens = min(self.tokens, 0.0)
+        elif adapt:
+            self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+            self._refill(now)
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 50)
+        async with self._slots:
+            self.in_flight -= 1
+            self._slots.notify_all()
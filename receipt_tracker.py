@@ -0,0 +1,161 @@
+import asyncio
+import json
+import aiohttp
+from metrics import METRICS
+from logs import get_logger
+
+log = get_logger(__name__)
+
+
+def to_hash_str(tx_hash):
+    """Normalize a transaction hash (str, bytes or HexBytes) to 0x-prefixed hex"""
+    if isinstance(tx_hash, str):
+        return tx_hash.lower() if tx_hash.startswith("0x") else "0x" + tx_hash.lower()
+    return "0x" + bytes(tx_hash).hex()
+
+
+class ReceiptTracker:
+    """Shared block watcher that resolves every pending receipt once per new block.
+
+    New heads come from an ``eth_subscribe`` websocket when ``ws_url`` is set,
+    otherwise from ``eth_blockNumber`` polling. Polling pauses while no receipt
+    is awaited, and ``block_number`` is None until it resumes. Receipts are
+    returned as raw JSON-RPC dicts (hex-encoded quantities).
+    """
+
+    def __init__(self, rpc, ws_url=None, poll_interval=1.0):
+        self.rpc = rpc
+        self.ws_url = ws_url
+        self.poll_interval = poll_interval
+        self.block_number = None
+        self._pending = {}
+        self._waiters = {}
+        self._block_listeners = []
+        self._seen = set()
+        self._task = None
+        self._wake = None  # set while waits are pending; created on the running loop
+
+    def add_block_listener(self, callback):
+        """Call ``callback(block_number)`` on every new block"""
+        self._block_listeners.append(callback)
+
+    def start(self):
+        if self._wake is None:
+            self._wake = asyncio.Event()
+        self._wake.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        for future in self._pending.values():
+            if not future.done():
+                future.cancel()
+        self._pending.clear()
+        self._waiters.clear()
+
+    async def wait(self, tx_hash, timeout=300):
+        """Wait for a receipt; returns None if it isn't mined within timeout"""
+        self.start()
+        key = to_hash_str(tx_hash)
+        future = self._pending.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[key] = future
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            done, _ = await asyncio.wait({future}, timeout=timeout)
+            return future.result() if done else None
+        finally:
+            # stop() may have cleared the books while this wait was unwinding
+            remaining = self._waiters.pop(key, 1) - 1
+            if remaining > 0:
+                self._waiters[key] = remaining
+            else:
+                if self._pending.get(key) is future:
+                    del self._pending[key]
+                self._seen.discard(key)
+
+    async def _run(self):
+        if self.ws_url:
+            try:
+                await self._watch_websocket()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning(f"Block subscription failed ({str(e)}), polling instead")
+        await self._watch_polling()
+
+    async def _watch_websocket(self):
+        session = await self.rpc.session()
+        async with session.ws_connect(self.ws_url, heartbeat=30) as ws:
+            await ws.send_json(
+                {"jsonrpc": "2.0", "id": 1, "method": "eth_subscribe", "params": ["newHeads"]}
+            )
+            async for message in ws:
+                if message.type != aiohttp.WSMsgType.TEXT:
+                    break
+                data = json.loads(message.data)
+                head = data.get("params", {}).get("result")
+                if head and "number" in head:
+                    await self._on_block(int(head["number"], 16))
+        raise ConnectionError("websocket closed")
+
+    async def _watch_polling(self):
+        while True:
+            if not self._pending:
+                # Nothing to resolve (e.g. between cycles): stop polling until the next wait
+                self.block_number = None
+                self._wake.clear()
+                await self._wake.wait()
+            try:
+                number = int(await self.rpc.call("eth_blockNumber"), 16)
+                if self.block_number is None or number > self.block_number:
+                    await self._on_block(number)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning(f"Block polling error: {str(e)}", coalesce="block-polling")
+            await asyncio.sleep(self.poll_interval)
+
+    async def _on_block(self, number):
+        self.block_number = number
+        for callback in self._block_listeners:
+            callback(number)
+
+        hashes = [key for key, future in self._pending.items() if not future.done()]
+        if not hashes:
+            return
+        # Ride along in the same batch to time when each tx first reaches the node
+        unseen = [key for key in hashes if key not in self._seen]
+        try:
+            responses = await self.rpc.batch(
+                [("eth_getTransactionReceipt", [key]) for key in hashes]
+                + [("eth_getTransactionByHash", [key]) for key in unseen]
+            )
+        except Exception as e:
+            log.warning(f"Receipt lookup failed at block {number}: {str(e)}", coalesce="receipt-lookup")
+            return
+        for key, response in zip(unseen, responses[len(hashes):]):
+            if response.get("result"):
+                self._seen.add(key)
+                METRICS.tx_phase(key, "first_seen")
+        for key, response in zip(hashes, responses):
+            receipt = response.get("result")
+            if receipt and to_hash_str(receipt.get("transactionHash", key)) != key:
+                log.warning(
+                    f"Node returned the receipt of {receipt['transactionHash']} for {key}, ignoring it",
+                    coalesce=f"receipt-mismatch-{key}",
+                )
+                continue
+            future = self._pending.get(key)
+            if receipt and future is not None and not future.done():
+                self._seen.discard(key)
+                METRICS.tx_phase(key, "mined", final=True)
+                future.set_result(receipt)
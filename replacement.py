@@ -0,0 +1,240 @@
+import asyncio
+import os
+from metrics import METRICS
+from nonce_manager import is_known_tx_error, is_nonce_error
+from receipt_tracker import to_hash_str
+from logs import get_logger
+
+log = get_logger(__name__)
+
+# Nodes reject a same-nonce replacement unless both fee caps rise by at
+# least 10%; 12.5% clears every common client
+FEE_BUMP_NUMERATOR = 9
+FEE_BUMP_DENOMINATOR = 8
+
+
+def bump_fee(fee):
+    return -(-fee * FEE_BUMP_NUMERATOR // FEE_BUMP_DENOMINATOR) + 1
+
+
+class StuckTransactionError(Exception):
+    """A wait ran out while a version of the transaction still holds its unmined nonce.
+
+    Sending the operation again would only queue a new transaction behind it,
+    so this is not retryable; the engine keeps fee-bumping the queued one.
+    """
+
+    retryable = False
+
+    def __init__(self, nonce, tx_hash):
+        self.nonce = nonce
+        self.tx_hash = tx_hash
+        super().__init__(f"nonce {nonce} still unmined, {tx_hash} is queued at the node")
+
+
+class PendingTx:
+    """One logical transaction: every signed version shares the nonce"""
+
+    __slots__ = ("tx", "wallet", "step", "hashes", "sent_block", "future", "watchers", "bumping")
+
+    def __init__(self, tx, wallet, step, tx_hash, sent_block):
+        self.tx = tx
+        self.wallet = wallet
+        self.step = step
+        self.hashes = [tx_hash]
+        self.sent_block = sent_block
+        self.future = asyncio.get_running_loop().create_future()
+        self.watchers = []
+        self.bumping = False
+
+
+class ReplacementEngine:
+    """Re-signs transactions that sit unmined for ``stuck_blocks`` blocks.
+
+    Each replacement reuses the nonce with both fee caps bumped 12.5% (or to
+    the current fees, if higher), up to ``max_replacements`` times and never
+    above ``max_fee_cap``. A wait on any hash of the operation resolves with
+    whichever version is mined first.
+    """
+
+    def __init__(self, rpc, tracker, gas_oracle, stuck_blocks=5, max_replacements=5,
+                 max_fee_cap=None, on_replace=None, on_forget=None, watch_timeout=3600, signer=None):
+        self.rpc = rpc
+        self.signer = signer
+        self.tracker = tracker
+        self.gas_oracle = gas_oracle
+        self.stuck_blocks = stuck_blocks
+        self.max_replacements = max_replacements
+        self.max_fee_cap = max_fee_cap or 2 * gas_oracle.max_gas_price
+        self.on_replace = on_replace
+        self.on_forget = on_forget
+        self.watch_timeout = watch_timeout
+        self._ops = {}
+        self._bumps = set()  # running _replace tasks, referenced until done
+        tracker.add_block_listener(self.on_block)
+
+    @classmethod
+    def from_env(cls, rpc, tracker, gas_oracle, on_replace=None, on_forget=None, signer=None):
+        return cls(
+            rpc,
+            tracker,
+            gas_oracle,
+            stuck_blocks=int(os.getenv("STUCK_TX_BLOCKS", "5")),
+            max_replacements=int(os.getenv("MAX_TX_REPLACEMENTS", "5")),
+            on_replace=on_replace,
+            on_forget=on_forget,
+            signer=signer,
+        )
+
+    def track(self, signed_tx, tx, wallet, step=None):
+        """Register a signed transaction so it can be replaced if it gets stuck"""
+        tx_hash = to_hash_str(signed_tx.hash)
+        op = PendingTx(dict(tx), wallet, step, tx_hash, self.tracker.block_number)
+        self._ops[tx_hash] = op
+        self._watch(op, tx_hash)
+
+    def discard(self, tx_hash):
+        """Forget a transaction that never made it to the node"""
+        op = self._ops.get(to_hash_str(tx_hash))
+        if op is not None:
+            self._forget(op)
+
+    def versions(self, tx_hash):
+        """Hashes of every signed version of the transaction; grows as it is replaced"""
+        op = self._ops.get(to_hash_str(tx_hash))
+        return op.hashes if op is not None else [to_hash_str(tx_hash)]
+
+    async def wait(self, tx_hash, timeout=300):
+        """Wait for the receipt of whichever version of the transaction is mined.
+
+        Returns None once the nonce went to another transaction or the node
+        dropped every version; raises StuckTransactionError while one is
+        still queued, and keeps replacing it until ``watch_timeout``.
+        """
+        op = self._ops.get(to_hash_str(tx_hash))
+        if op is None:
+            return await self.tracker.wait(tx_hash, timeout)
+        try:
+            return await asyncio.wait_for(asyncio.shield(op.future), timeout)
+        except asyncio.TimeoutError:
+            try:
+                return await self._recheck(op)
+            except StuckTransactionError:
+                op.future.add_done_callback(lambda _: self._forget(op))
+                asyncio.get_running_loop().call_later(self.watch_timeout, self._forget, op)
+                op = None
+                raise
+        finally:
+            if op is not None:
+                self._forget(op)
+
+    async def _recheck(self, op):
+        """Where a timed-out transaction stands: a late receipt, None if gone, or stuck"""
+        nonce = op.tx["nonce"]
+        try:
+            mined = int(await self.rpc.call("eth_getTransactionCount", [op.wallet.address, "latest"]), 16)
+            method = "eth_getTransactionReceipt" if mined > nonce else "eth_getTransactionByHash"
+            responses = await self.rpc.batch([(method, [tx_hash]) for tx_hash in op.hashes])
+        except Exception as e:
+            # Unknown is treated as queued: a duplicate costs more than a late retry
+            log.warning(f"Could not check nonce {nonce} after the wait: {str(e)}")
+            raise StuckTransactionError(nonce, op.hashes[-1]) from e
+        found = [response["result"] for response in responses if response.get("result")]
+        if mined > nonce:
+            # The nonce is used: by one of ours (mined just now) or by another tx
+            return found[0] if found else None
+        if found:
+            raise StuckTransactionError(nonce, op.hashes[-1])
+        return None
+
+    def _watch(self, op, tx_hash):
+        async def watch():
+            receipt = await self.tracker.wait(tx_hash, self.watch_timeout)
+            if receipt is not None and not op.future.done():
+                op.future.set_result(receipt)
+
+        op.watchers.append(asyncio.create_task(watch()))
+
+    def _forget(self, op):
+        for tx_hash in op.hashes:
+            self._ops.pop(tx_hash, None)
+        for watcher in op.watchers:
+            watcher.cancel()
+        if not op.future.done():
+            op.future.cancel()
+        if self.on_forget is not None:
+            self.on_forget(op)
+
+    def on_block(self, block_number):
+        for op in set(self._ops.values()):
+            if op.future.done() or op.bumping:
+                continue
+            if op.sent_block is None:
+                op.sent_block = block_number
+            elif block_number - op.sent_block >= self.stuck_blocks:
+                if len(op.hashes) > self.max_replacements:
+                    continue
+                op.bumping = True
+                task = asyncio.create_task(self._replace(op, block_number))
+                self._bumps.add(task)
+                task.add_done_callback(self._bumps.discard)
+
+    async def _replace(self, op, block_number):
+        try:
+            mined = int(await self.rpc.call("eth_getTransactionCount", [op.wallet.address, "latest"]), 16)
+            if op.tx["nonce"] != mined:
+                # Mined already, or queued behind a lower nonce that no fee
+                # bump of this one can unblock: look again in stuck_blocks
+                op.sent_block = block_number
+                return
+            current = await self.gas_oracle.fee_params()
+            tip = max(bump_fee(op.tx["maxPriorityFeePerGas"]), current["maxPriorityFeePerGas"])
+            max_fee = max(bump_fee(op.tx["maxFeePerGas"]), current["maxFeePerGas"], tip)
+            if max_fee > self.max_fee_cap:
+                log.warning(
+                    f"Nonce {op.tx['nonce']} stuck but already at the fee cap, waiting",
+                    coalesce=f"fee-cap-{op.hashes[0]}",
+                )
+                op.sent_block = block_number
+                return
+            tx = {**op.tx, "maxFeePerGas": max_fee, "maxPriorityFeePerGas": tip}
+            if self.signer is not None:
+                signed_tx = await self.signer.sign(op.wallet, tx)
+            else:
+                signed_tx = op.wallet.account.sign_transaction(tx)
+            new_hash = to_hash_str(signed_tx.hash)
+            try:
+                await self.rpc.call("eth_sendRawTransaction", ["0x" + bytes(signed_tx.rawTransaction).hex()])
+            except Exception as e:
+                if "nonce too low" in str(e).lower():
+                    # An earlier version was just mined; its watcher resolves the wait
+                    return
+                if is_known_tx_error(e):
+                    # A resent post of this same replacement got through
+                    pass
+                elif is_nonce_error(e):
+                    # Underpriced against what the node holds: retry next block
+                    op.sent_block = block_number - self.stuck_blocks + 1
+                    return
+                else:
+                    raise
+            if op.future.done():
+                return
+            log.warning(
+                f"Replaced stuck nonce {tx['nonce']} after {block_number - op.sent_block} blocks: {new_hash}",
+                tx_hash=new_hash,
+                replaces=op.hashes[-1],
+            )
+            METRICS.inc("plaza_tx_replacements_total")
+            METRICS.tx_replaced(op.hashes[-1], new_hash)
+            op.tx = tx
+            op.hashes.append(new_hash)
+            op.sent_block = block_number
+            self._ops[new_hash] = op
+            self._watch(op, new_hash)
+            if self.on_replace is not None:
+                self.on_replace(op, new_hash)
+        except Exception as e:
+            log.warning(f"Fee bump failed for nonce {op.tx['nonce']}: {str(e)}")
+        finally:
+            op.bumping = False
@@ -0,0 +1,183 @@
+import asyncio
+import contextvars
+import os
+import random
+import time
+from metrics import METRICS
+from logs import get_logger
+
+log = get_logger(__name__)
+
+# Errors no amount of waiting fixes: the wallet itself can't pay or sign
+FATAL_MESSAGES = (
+    "insufficient funds",
+    "invalid sender",
+    "exceeds block gas limit",
+    "intrinsic gas too low",
+)
+
+# The innermost deadline of the running task
+_DEADLINE = contextvars.ContextVar("plaza_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """The time budget ran out before the work could finish or retry"""
+
+
+class CircuitOpenError(Exception):
+    """A dependency failed repeatedly; calls are refused until it cools down"""
+
+    def __init__(self, name, retry_after):
+        self.name = name
+        self.retry_after = retry_after
+        super().__init__(f"{name} circuit open, retry in {retry_after:.0f}s")
+
+
+class RetryableError(Exception):
+    """An attempt that finished without succeeding, e.g. an unconfirmed transaction"""
+
+
+def is_retryable(error):
+    """Classify an exception: True if a later attempt may succeed"""
+    if isinstance(error, DeadlineExceeded):
+        return False
+    retryable = getattr(error, "retryable", None)  # RevertError, FaucetError
+    if retryable is not None:
+        return retryable
+    message = str(error).lower()
+    return not any(text in message for text in FATAL_MESSAGES)
+
+
+class deadline_scope:
+    """Give the current task at most ``seconds``, never more than an enclosing scope"""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.token = None
+
+    def __enter__(self):
+        expires = time.monotonic() + self.seconds
+        parent = _DEADLINE.get()
+        self.token = _DEADLINE.set(expires if parent is None else min(parent, expires))
+        return self
+
+    def __exit__(self, *exc):
+        _DEADLINE.reset(self.token)
+
+
+def time_left(cap=None):
+    """Seconds until the current deadline, at most ``cap``; None if unbounded"""
+    expires = _DEADLINE.get()
+    if expires is None:
+        return cap
+    remaining = max(0.0, expires - time.monotonic())
+    return remaining if cap is None else min(cap, remaining)
+
+
+class CircuitBreaker:
+    """Opens after ``threshold`` consecutive failures and refuses calls for ``reset_after`` s.
+
+    After the cooldown one probe call is let through (half-open): success
+    closes the circuit, failure opens it for another cooldown.
+    """
+
+    def __init__(self, name, threshold=5, reset_after=30.0):
+        self.name = name
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at = None
+        self._probe_started = None
+
+    @classmethod
+    def from_env(cls, name):
+        return cls(
+            name,
+            threshold=int(os.getenv("BREAKER_THRESHOLD", "5")),
+            reset_after=float(os.getenv("BREAKER_RESET_SECONDS", "30")),
+        )
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+    def check(self):
+        """Raise CircuitOpenError unless a call may go through now"""
+        if self.opened_at is None:
+            return
+        now = time.monotonic()
+        remaining = self.opened_at + self.reset_after - now
+        # One probe at a time; a probe that never reports back (cancelled)
+        # gives way to another after a cooldown
+        probing = self._probe_started is not None and now - self._probe_started < self.reset_after
+        if remaining > 0 or probing:
+            raise CircuitOpenError(self.name, max(remaining, 1.0))
+        self._probe_started = now
+
+    def record_success(self):
+        if self.opened_at is not None:
+            log.success(f"{self.name} circuit closed")
+        self.failures = 0
+        self.opened_at = None
+        self._probe_started = None
+
+    def record_failure(self):
+        self.failures += 1
+        probe_failed = self._probe_started is not None
+        if probe_failed or (self.opened_at is None and self.failures >= self.threshold):
+            if not probe_failed:
+                log.warning(f"{self.name} circuit open after {self.failures} failures", breaker=self.name)
+                METRICS.inc("plaza_circuit_open_total", breaker=self.name)
+            self.opened_at = time.monotonic()
+            self._probe_started = None
+
+
+class RetryPolicy:
+    """Runs an attempt until it succeeds, fails fatally, or runs out of attempts or time.
+
+    Waits between attempts are full-jitter exponential backoff, stretched to
+    an error's ``retry_after`` (open circuit, Cloudflare) when it has one. A
+    wait that would overrun the current deadline is not started; the last
+    error is raised instead, so a chain of retries can never outlive its
+    budget by more than one attempt already in flight.
+    """
+
+    def __init__(self, attempts=3, base_delay=2.0, max_delay=60.0):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    @classmethod
+    def from_env(cls, attempts=None):
+        return cls(
+            attempts=attempts or int(os.getenv("RETRY_ATTEMPTS", "3")),
+            base_delay=float(os.getenv("RETRY_BASE_DELAY", "2")),
+            max_delay=float(os.getenv("RETRY_MAX_DELAY", "60")),
+        )
+
+    def backoff(self, attempt, error=None):
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+        return max(delay, getattr(error, "retry_after", None) or 0)
+
+    async def run(self, attempt_fn, site):
+        """Await ``attempt_fn()`` until it returns, retrying retryable errors"""
+        for attempt in range(self.attempts):
+            remaining = time_left()
+            if remaining is not None and remaining <= 0:
+                raise DeadlineExceeded(f"{site}: out of time after {attempt} attempts")
+            try:
+                return await attempt_fn()
+            except Exception as e:
+                if attempt == self.attempts - 1 or not is_retryable(e):
+                    raise
+                delay = self.backoff(attempt, e)
+                remaining = time_left()
+                if remaining is not None and delay >= remaining:
+                    raise
+                METRICS.inc("plaza_retries_total", site=site)
+                log.warning(
+                    f"{site} attempt {attempt + 1}/{self.attempts} failed: {str(e)}; retrying in {delay:.0f}s",
+                    op=site,
+                    attempt=attempt + 1,
+                )
+                await asyncio.sleep(delay)
@@ -0,0 +1,187 @@
+import asyncio
+import functools
+import itertools
+import json
+import time
+from collections.abc import Mapping
+import aiohttp
+from metrics import METRICS
+from retry_policy import CircuitBreaker
+
+DEFAULT_RPC_URL = "https://sepolia.base.org"
+
+
+def json_default(obj):
+    """JSON fallback for web3 values: bytes and HexBytes as 0x-hex, AttributeDicts as dicts"""
+    if isinstance(obj, (bytes, bytearray)):
+        return "0x" + bytes(obj).hex()
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class RpcError(Exception):
+    """JSON-RPC error returned by the node"""
+
+    def __init__(self, method, error):
+        self.method = method
+        self.code = error.get("code")
+        self.data = error.get("data")
+        super().__init__(f"{method}: {error.get('message', error)}")
+
+
+class RpcClient:
+    """Single pooled keep-alive JSON-RPC client shared by every bot call path.
+
+    With an ``RpcPool`` the endpoint for each request is picked by the pool;
+    otherwise everything goes to ``endpoint_uri``.
+    """
+
+    def __init__(self, endpoint_uri=DEFAULT_RPC_URL, pool_size=20, timeout=30, pool=None, breaker=None):
+        self.pool = pool
+        # Fails requests fast while every endpoint is down, instead of each
+        # caller waiting out its own timeout
+        self.breaker = breaker or CircuitBreaker.from_env("rpc")
+        self.endpoint_uri = pool.endpoints[0].url if pool is not None else endpoint_uri
+        self.pool_size = pool_size
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self._session = None
+        self._session_lock = asyncio.Lock()
+        self._ids = itertools.count(1)
+        # Async callable taking a JSON-RPC payload and returning the decoded
+        # response; wrapped by the record/replay cassettes
+        self.transport = self._http_post
+
+    async def session(self):
+        """Return the shared aiohttp session, opening it on first use"""
+        if self._session is None or self._session.closed:
+            async with self._session_lock:
+                if self._session is None or self._session.closed:
+                    connector = aiohttp.TCPConnector(
+                        limit=self.pool_size,
+                        keepalive_timeout=60,
+                        ttl_dns_cache=300,
+                    )
+                    self._session = aiohttp.ClientSession(
+                        connector=connector,
+                        timeout=self.timeout,
+                        headers={"Content-Type": "application/json"},
+                        json_serialize=lambda obj: json.dumps(obj, default=json_default),
+                    )
+        return self._session
+
+    def _payload(self, method, params):
+        return {
+            "jsonrpc": "2.0",
+            "method": method,
+            "params": params or [],
+            "id": next(self._ids),
+        }
+
+    async def _post(self, payload):
+        self.breaker.check()
+        try:
+            response = await self.transport(payload)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return response
+
+    async def _http_post(self, payload):
+        if self.pool is not None:
+            return await self.pool.send(self._post_to, payload)
+        return await self._post_to(self.endpoint_uri, payload)
+
+    async def _post_to(self, url, payload):
+        session = await self.session()
+        async with session.post(url, json=payload) as response:
+            response.raise_for_status()
+            return await response.json(content_type=None)
+
+    async def request(self, method, params=None):
+        """Send one request and return the raw JSON-RPC response"""
+        started = time.perf_counter()
+        try:
+            response = await self._post(self._payload(method, params))
+        except Exception:
+            METRICS.inc("plaza_rpc_errors_total", method=method)
+            raise
+        finally:
+            METRICS.observe("plaza_rpc_request_seconds", time.perf_counter() - started, method=method)
+        METRICS.inc("plaza_rpc_requests_total", method=method)
+        if "error" in response:
+            METRICS.inc("plaza_rpc_errors_total", method=method)
+        return response
+
+    async def call(self, method, params=None):
+        """Send one request and return its result, raising RpcError on failure"""
+        response = await self.request(method, params)
+        if "error" in response:
+            raise RpcError(method, response["error"])
+        return response.get("result")
+
+    async def batch(self, calls):
+        """Send (method, params) pairs as one JSON-RPC batch, responses in call order"""
+        if not calls:
+            return []
+        payload = [self._payload(method, params) for method, params in calls]
+        started = time.perf_counter()
+        try:
+            responses = await self._post(payload)
+        except Exception:
+            METRICS.inc("plaza_rpc_errors_total", method="batch")
+            raise
+        finally:
+            METRICS.observe("plaza_rpc_request_seconds", time.perf_counter() - started, method="batch")
+        for method, _ in calls:
+            METRICS.inc("plaza_rpc_requests_total", method=method)
+        if isinstance(responses, dict):
+            # Some nodes answer a rejected batch with a single error object
+            raise RpcError("batch", responses.get("error", responses))
+        by_id = {response.get("id"): response for response in responses}
+        return [by_id.get(item["id"], {"error": {"message": "missing response"}}) for item in payload]
+
+    async def close(self):
+        close_transport = getattr(self.transport, "close", None)
+        if close_transport is not None:
+            close_transport()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+@functools.lru_cache(maxsize=None)
+def provider_class():
+    """The AsyncWeb3 provider class routing requests through an RpcClient.
+
+    Defined on first use: web3 takes longer to import than the rest of the
+    bot together, and nothing on the hot path needs it.
+    """
+    from web3.providers.async_base import AsyncBaseProvider
+
+    class RpcProvider(AsyncBaseProvider):
+        def __init__(self, client):
+            super().__init__()
+            self.client = client
+
+        async def make_request(self, method, params):
+            return await self.client.request(method, params)
+
+        async def is_connected(self):
+            try:
+                await self.client.call("web3_clientVersion")
+                return True
+            except Exception:
+                return False
+
+    return RpcProvider
+
+
+def make_web3(client):
+    """Build an AsyncWeb3 instance on top of the shared RPC client"""
+    from web3 import AsyncWeb3
+
+    return AsyncWeb3(provider_class()(client))
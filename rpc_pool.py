@@ -0,0 +1,225 @@
+import asyncio
+import os
+import time
+from urllib.parse import urlsplit
+from metrics import METRICS
+from rate_limit import (
+    AdaptiveLimiter,
+    RateLimitedError,
+    is_throttle_error,
+    retry_after,
+    throttled_response,
+)
+from logs import get_logger
+
+log = get_logger(__name__)
+
+# Methods whose payload should reach as many nodes as possible
+BROADCAST_METHODS = ("eth_sendRawTransaction",)
+
+
+class Endpoint:
+    """Health record for one RPC endpoint: EWMA latency, error rate and pacing"""
+
+    __slots__ = (
+        "url", "name", "latency", "error_rate", "failures", "ejections", "ejected_until", "limiter",
+    )
+
+    def __init__(self, url, limiter=None):
+        self.url = url
+        self.limiter = limiter or AdaptiveLimiter()
+        parts = urlsplit(url)
+        # Label without the path or query, where provider API keys live
+        self.name = parts.netloc.rsplit("@", 1)[-1] or url
+        self.latency = None
+        self.error_rate = 0.0
+        self.failures = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+
+    def healthy(self, now):
+        return self.ejected_until <= now
+
+    def score(self):
+        """Expected cost of a request; untried endpoints go first"""
+        return (self.latency or 0.0) * (1 + 10 * self.error_rate)
+
+
+class RpcPool:
+    """Routes JSON-RPC payloads across several endpoints.
+
+    Reads go to the healthy endpoint with the best EWMA latency/error score,
+    fail over to the next one on transport errors and, with ``hedge_after``
+    set, race a second endpoint when the first is slow. Raw transactions are
+    sent to ``broadcast_fanout`` endpoints at once. An endpoint that fails
+    ``eject_after`` times in a row is ejected for an exponentially growing
+    backoff. Each endpoint paces its own traffic with an ``AdaptiveLimiter``
+    from ``limiter_factory``; throttled reads are retried up to
+    ``throttle_retries`` times once the limiter has slowed down.
+    """
+
+    def __init__(self, urls, alpha=0.2, hedge_after=None, broadcast_fanout=3,
+                 eject_after=3, base_backoff=5.0, max_backoff=300.0, limiter_factory=AdaptiveLimiter,
+                 throttle_retries=3):
+        if not urls:
+            raise ValueError("RpcPool needs at least one endpoint")
+        self.endpoints = [Endpoint(url, limiter_factory()) for url in urls]
+        self.alpha = alpha
+        self.hedge_after = hedge_after
+        self.broadcast_fanout = broadcast_fanout
+        self.eject_after = eject_after
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.throttle_retries = throttle_retries
+        self._background = set()
+
+    @classmethod
+    def from_env(cls, default_url):
+        """Endpoints from RPC_URLS (comma-separated), falling back to RPC_URL"""
+        urls = os.getenv("RPC_URLS") or os.getenv("RPC_URL") or default_url
+        hedge_after = os.getenv("RPC_HEDGE_AFTER")
+        return cls(
+            [url.strip() for url in urls.split(",") if url.strip()],
+            hedge_after=float(hedge_after) if hedge_after else None,
+            broadcast_fanout=int(os.getenv("RPC_BROADCAST_FANOUT", "3")),
+            limiter_factory=AdaptiveLimiter.from_env,
+        )
+
+    def ranked(self):
+        """Healthy endpoints best-first; if every endpoint is ejected, the soonest back"""
+        now = time.monotonic()
+        healthy = [endpoint for endpoint in self.endpoints if endpoint.healthy(now)]
+        if not healthy:
+            return [min(self.endpoints, key=lambda endpoint: endpoint.ejected_until)]
+        return sorted(healthy, key=Endpoint.score)
+
+    def _record_success(self, endpoint, elapsed):
+        if endpoint.latency is None:
+            endpoint.latency = elapsed
+        else:
+            endpoint.latency += self.alpha * (elapsed - endpoint.latency)
+        endpoint.error_rate *= 1 - self.alpha
+        endpoint.failures = 0
+        endpoint.ejections = 0
+        METRICS.observe("plaza_rpc_endpoint_seconds", elapsed, endpoint=endpoint.name)
+
+    def _record_failure(self, endpoint, error):
+        endpoint.error_rate += self.alpha * (1 - endpoint.error_rate)
+        endpoint.failures += 1
+        METRICS.inc("plaza_rpc_endpoint_errors_total", endpoint=endpoint.name)
+        if endpoint.failures >= self.eject_after and len(self.endpoints) > 1:
+            backoff = min(self.max_backoff, self.base_backoff * 2 ** endpoint.ejections)
+            endpoint.ejections += 1
+            endpoint.failures = 0
+            endpoint.ejected_until = time.monotonic() + backoff
+            log.warning(
+                f"RPC endpoint {endpoint.name} ejected for {backoff:.0f}s: {str(error)}",
+                endpoint=endpoint.name,
+            )
+
+    async def _send_to(self, post, endpoint, payload):
+        limiter = endpoint.limiter
+        await limiter.acquire(len(payload) if isinstance(payload, list) else 1)
+        started = time.perf_counter()
+        try:
+            response = await post(endpoint.url, payload)
+            throttle = throttled_response(response)
+            if throttle is not None:
+                raise RateLimitedError(throttle.get("message", throttle))
+        except asyncio.CancelledError:
+            await limiter.release(adapt=False)
+            # Lost a hedge race: it took at least this long
+            elapsed = time.perf_counter() - started
+            if endpoint.latency is None:
+                endpoint.latency = elapsed
+            elif elapsed > endpoint.latency:
+                endpoint.latency += self.alpha * (elapsed - endpoint.latency)
+            raise
+        except Exception as e:
+            throttled = is_throttle_error(e)
+            # Only congestion signals adapt the pacing; a refused connection doesn't
+            await limiter.release(throttled, retry_after(e), adapt=throttled)
+            if throttled:
+                METRICS.inc("plaza_rpc_throttled_total", endpoint=endpoint.name)
+            self._record_failure(endpoint, e)
+            raise
+        await limiter.release()
+        self._record_success(endpoint, time.perf_counter() - started)
+        return response
+
+    async def send(self, post, payload):
+        """Send ``payload`` with ``post(url, payload)`` according to the routing policy"""
+        items = payload if isinstance(payload, list) else [payload]
+        if any(item["method"] in BROADCAST_METHODS for item in items):
+            return await self._broadcast(post, payload)
+        return await self._read(post, payload)
+
+    async def _read(self, post, payload):
+        candidates = self.ranked()
+        throttle_retries = self.throttle_retries
+        last_error = None
+        while candidates:
+            endpoint = candidates.pop(0)
+            first = asyncio.ensure_future(self._send_to(post, endpoint, payload))
+            racers = {first: endpoint}
+            if self.hedge_after is not None and candidates:
+                done, _ = await asyncio.wait({first}, timeout=self.hedge_after)
+                if not done:
+                    hedge = candidates.pop(0)
+                    METRICS.inc("plaza_rpc_hedges_total", endpoint=hedge.name)
+                    racers[asyncio.ensure_future(self._send_to(post, hedge, payload))] = hedge
+            pending = set(racers)
+            try:
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        if task.exception() is None:
+                            return task.result()
+                        last_error = task.exception()
+                        # A throttled endpoint is paced by its limiter now; try it again
+                        if is_throttle_error(last_error) and throttle_retries > 0:
+                            throttle_retries -= 1
+                            candidates.append(racers[task])
+            finally:
+                for task in pending:
+                    task.cancel()
+        raise last_error
+
+    async def _broadcast(self, post, payload):
+        for attempt in range(self.throttle_retries + 1):
+            try:
+                return await self._broadcast_once(post, payload)
+            except Exception as e:
+                # Resending a raw tx is harmless; the caller treats "already known" as sent
+                if attempt == self.throttle_retries or not is_throttle_error(e):
+                    raise
+
+    async def _broadcast_once(self, post, payload):
+        targets = self.ranked()[: max(1, self.broadcast_fanout)]
+        tasks = [asyncio.ensure_future(self._send_to(post, endpoint, payload)) for endpoint in targets]
+        # Slower endpoints keep propagating the tx after the first answer is back
+        for task in tasks:
+            self._background.add(task)
+            task.add_done_callback(self._finish_background)
+
+        first_error_response = None
+        last_error = None
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                response = await next_done
+            except Exception as e:
+                last_error = e
+                continue
+            items = response if isinstance(response, list) else [response]
+            if not any("error" in item for item in items):
+                return response
+            # "already known" from one node is expected once another has it
+            first_error_response = first_error_response or response
+        if first_error_response is not None:
+            return first_error_response
+        raise last_error
+
+    def _finish_background(self, task):
+        self._background.discard(task)
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,138 @@
+import asyncio
+import multiprocessing
+import os
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from logs import get_logger
+
+log = get_logger(__name__)
+
+# Worker-process state: address -> LocalAccount, filled by the initializer
+_ACCOUNTS = {}
+
+
+def _init_worker(private_keys):
+    # Ctrl+C is the parent's to handle; it shuts the pool down in order
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    from eth_account import Account
+
+    for private_key in private_keys:
+        account = Account.from_key(private_key)
+        _ACCOUNTS[account.address] = account
+
+
+def _ready():
+    return len(_ACCOUNTS)
+
+
+def _sign_chunk(items):
+    """Sign (address, tx) pairs with the worker's keys; returns (raw, hash) bytes"""
+    signed = []
+    for address, tx in items:
+        signed_tx = _ACCOUNTS[address].sign_transaction(tx)
+        signed.append((bytes(signed_tx.rawTransaction), bytes(signed_tx.hash)))
+    return signed
+
+
+class SignedTx:
+    """Raw signed bytes and hash, shaped like eth_account's SignedTransaction"""
+
+    __slots__ = ("rawTransaction", "hash")
+
+    def __init__(self, raw_transaction, tx_hash):
+        self.rawTransaction = raw_transaction
+        self.hash = tx_hash
+
+
+class TransactionSigner:
+    """Signs transactions in a process pool whose workers already hold the keys.
+
+    ECDSA signing and RLP encoding are pure CPU work, so on the event loop
+    they stall every other wallet. ``sign_batch`` spreads a batch over the
+    workers in contiguous chunks and returns SignedTx objects in input order.
+    Keys are handed to the workers once, when the pool starts; registering a
+    wallet the pool does not know restarts it with the full key set. Until
+    the workers are up, and always with ``workers=0``, signing is inline with
+    the wallet's own account.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = min(4, os.cpu_count() or 1) if workers is None else workers
+        self._wallets = {}
+        self._pool = None
+        self._pool_addresses = frozenset()
+        self._warming = []
+
+    @classmethod
+    def from_env(cls):
+        workers = os.getenv("SIGNER_WORKERS")
+        return cls(int(workers) if workers else None)
+
+    def register(self, wallets):
+        """Make wallets signable, (re)starting the pool if any are new"""
+        for wallet in wallets:
+            self._wallets[wallet.address] = wallet
+        if self.workers <= 0 or self._pool_addresses.issuperset(self._wallets):
+            return
+        if self._pool is not None:
+            # In-flight batches still finish on the old workers
+            self._pool.shutdown(wait=False)
+        self._pool_addresses = frozenset(self._wallets)
+        self._pool = ProcessPoolExecutor(
+            self.workers,
+            # Forking would copy the loop, its sockets and the logging thread
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=([wallet.private_key for wallet in self._wallets.values()],),
+        )
+        # Start the workers now rather than on the first transaction
+        self._warming = [self._pool.submit(_ready) for _ in range(self.workers)]
+
+    @property
+    def ready(self):
+        """Whether every worker has started and loaded its keys"""
+        if self._pool is None:
+            return False
+        if any(future.done() and future.exception() for future in self._warming):
+            # Workers can't start here (no spawn support, missing imports): sign inline
+            log.warning("Signing workers failed to start, signing on the event loop")
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+            self._warming = []
+            self.workers = 0
+            return False
+        self._warming = [future for future in self._warming if not future.done()]
+        return not self._warming
+
+    async def sign_batch(self, items):
+        """Sign (wallet, tx) pairs off the event loop; returns SignedTx in order"""
+        if not items:
+            return []
+        self.register(wallet for wallet, _ in items)
+        if not self.ready:
+            # No pool, or its workers are still importing: don't wait on them
+            return [
+                SignedTx(bytes(signed.rawTransaction), bytes(signed.hash))
+                for signed in (wallet.account.sign_transaction(tx) for wallet, tx in items)
+            ]
+        pairs = [(wallet.address, tx) for wallet, tx in items]
+        size = -(-len(pairs) // self.workers)
+        loop = asyncio.get_running_loop()
+        chunks = await asyncio.gather(
+            *(
+                loop.run_in_executor(self._pool, _sign_chunk, pairs[i : i + size])
+                for i in range(0, len(pairs), size)
+            )
+        )
+        return [SignedTx(raw, tx_hash) for chunk in chunks for raw, tx_hash in chunk]
+
+    async def sign(self, wallet, tx):
+        (signed,) = await self.sign_batch([(wallet, tx)])
+        return signed
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+            self._pool_addresses = frozenset()
+            self._warming = []
@@ -0,0 +1,71 @@
+from dataclasses import dataclass
+from contracts import decode_uint
+from rpc import RpcError
+
+
+@dataclass
+class WalletSnapshot:
+    """Consistent view of a wallet's on-chain state at a single block"""
+
+    address: str
+    block_number: int
+    eth_balance: int
+    allowance: int
+    wsteth_balance: int
+    bond_token: str
+    leverage_token: str
+    bond_balance: int
+    leverage_balance: int
+
+    def token_address(self, token_type):
+        return self.bond_token if token_type == 0 else self.leverage_token
+
+    def token_balance(self, token_type):
+        return self.bond_balance if token_type == 0 else self.leverage_balance
+
+
+def _result(response):
+    if "error" in response:
+        raise RpcError("batch", response["error"])
+    return response["result"]
+
+
+def _eth_call(to, data, block):
+    return ("eth_call", [{"to": to, "data": data}, block])
+
+
+async def fetch_wallet_snapshot(rpc, contracts, address, block_number=None):
+    """Fetch a WalletSnapshot with one JSON-RPC batch pinned to block_number.
+
+    When the caller doesn't know a recent block number, it is fetched first.
+    """
+    token_addresses = await contracts.token_addresses()
+    if block_number is None:
+        block_number = int(await rpc.call("eth_blockNumber"), 16)
+
+    block = hex(block_number)
+    balance_of = contracts.balance_of_data(address)
+    state = await rpc.batch(
+        [
+            ("eth_getBalance", [address, block]),
+            _eth_call(
+                contracts.wsteth_address,
+                contracts.allowance_data(address, contracts.pool_address),
+                block,
+            ),
+            _eth_call(contracts.wsteth_address, balance_of, block),
+            _eth_call(token_addresses[0], balance_of, block),
+            _eth_call(token_addresses[1], balance_of, block),
+        ]
+    )
+    return WalletSnapshot(
+        address=address,
+        block_number=block_number,
+        eth_balance=int(_result(state[0]), 16),
+        allowance=decode_uint(_result(state[1])),
+        wsteth_balance=decode_uint(_result(state[2])),
+        bond_token=token_addresses[0],
+        leverage_token=token_addresses[1],
+        bond_balance=decode_uint(_result(state[3])),
+        leverage_balance=decode_uint(_result(state[4])),
+    )
@@ -0,0 +1,94 @@
+import contextlib
+import sqlite3
+import time
+
+STATE_DB_FILE = "plaza_state.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cycles (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE TABLE IF NOT EXISTS wallet_steps (
+    cycle_id INTEGER NOT NULL,
+    address TEXT NOT NULL,
+    step TEXT NOT NULL,
+    status TEXT NOT NULL,
+    tx_hash TEXT,
+    nonce INTEGER,
+    gas_used INTEGER,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (cycle_id, address, step)
+);
+"""
+
+# Step statuses
+SIGNED = "signed"
+DONE = "done"
+FAILED = "failed"
+
+
+class StateStore:
+    """Embedded SQLite (WAL) record of per-wallet progress for resumable cycles"""
+
+    def __init__(self, path=STATE_DB_FILE):
+        self.path = path
+        self.conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """Run the block as one transaction; the connection autocommits otherwise"""
+        self.conn.execute("BEGIN")
+        try:
+            yield self.conn
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def current_cycle(self):
+        """Return the unfinished cycle id, starting a new cycle if there is none"""
+        row = self.conn.execute(
+            "SELECT id FROM cycles WHERE finished_at IS NULL ORDER BY id DESC LIMIT 1"
+        ).fetchone()
+        if row:
+            return row[0]
+        return self.conn.execute(
+            "INSERT INTO cycles (started_at) VALUES (?)", (time.time(),)
+        ).lastrowid
+
+    def finish_cycle(self, cycle_id):
+        self.conn.execute(
+            "UPDATE cycles SET finished_at = ? WHERE id = ?", (time.time(), cycle_id)
+        )
+
+    def record_step(self, cycle_id, address, step, status, tx_hash=None, nonce=None, gas_used=None):
+        """Upsert a step, keeping earlier tx details when new ones aren't given"""
+        self.conn.execute(
+            """
+            INSERT INTO wallet_steps
+                (cycle_id, address, step, status, tx_hash, nonce, gas_used, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (cycle_id, address, step) DO UPDATE SET
+                status = excluded.status,
+                tx_hash = COALESCE(excluded.tx_hash, tx_hash),
+                nonce = COALESCE(excluded.nonce, nonce),
+                gas_used = COALESCE(excluded.gas_used, gas_used),
+                updated_at = excluded.updated_at
+            """,
+            (cycle_id, address, step, status, tx_hash, nonce, gas_used, time.time()),
+        )
+
+    def step(self, cycle_id, address, step):
+        """Return (status, tx_hash) for a step, or None if it never started"""
+        return self.conn.execute(
+            "SELECT status, tx_hash FROM wallet_steps WHERE cycle_id = ? AND address = ? AND step = ?",
+            (cycle_id, address, step),
+        ).fetchone()
+
+    def close(self):
+        self.conn.close()
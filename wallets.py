@@ -0,0 +1,76 @@
+import os
+from eth_keys import keys
+from eth_keys.exceptions import ValidationError
+from logs import get_logger
+
+log = get_logger(__name__)
+
+
+class Wallet:
+    """Derived wallet: address computed once per key, signing account on first use"""
+
+    __slots__ = ("index", "address", "private_key", "_account")
+
+    def __init__(self, index, private_key):
+        self.index = index
+        self.private_key = private_key
+        self._account = None
+        try:
+            key = keys.PrivateKey(bytes.fromhex(private_key[2:] if private_key.startswith("0x") else private_key))
+        except ValidationError as e:
+            raise ValueError(str(e)) from e
+        self.address = key.public_key.to_checksum_address()
+
+    @property
+    def account(self):
+        """eth_account LocalAccount for the key; eth_account is imported here, not at startup"""
+        if self._account is None:
+            from eth_account import Account
+
+            self._account = Account.from_key(self.private_key)
+        return self._account
+
+    def __repr__(self):
+        return f"Wallet({self.index}, {self.address})"
+
+
+class WalletRegistry:
+    """Loads the key file once and re-reads it only when its mtime changes"""
+
+    def __init__(self, path="private_keys.txt"):
+        self.path = path
+        self._mtime = None
+        self._wallets = []
+        self._by_key = {}
+
+    def load(self):
+        """Return the current wallet list, re-deriving only new keys"""
+        mtime = os.stat(self.path).st_mtime_ns
+        if mtime == self._mtime:
+            return self._wallets
+
+        with open(self.path, "r") as f:
+            private_keys = [
+                line.strip()
+                for line in f
+                if line.strip() and not line.startswith("#")
+            ]
+
+        by_key = {}
+        wallets = []
+        for index, private_key in enumerate(private_keys, 1):
+            wallet = by_key.get(private_key) or self._by_key.get(private_key)
+            if wallet is None:
+                try:
+                    wallet = Wallet(index, private_key)
+                except ValueError:
+                    log.error(f"Skipping invalid private key on entry {index}")
+                    continue
+            wallet.index = index
+            by_key[private_key] = wallet
+            wallets.append(wallet)
+
+        self._by_key = by_key
+        self._wallets = wallets
+        self._mtime = mtime
+        return wallets